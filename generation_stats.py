@@ -10,16 +10,17 @@
 
 import sys
 import argparse
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import Optional, List, Dict, Tuple, Set
-from collections import defaultdict
+from collections import defaultdict, Counter
 import statistics
+from array import array
 
 sys.path.insert(0, '.')
 from lib import parse_gedcom, Person, Family, GedcomData
 
 
-@dataclass
+@dataclass(slots=True)
 class GenerationData:
     """Данные о поколении."""
     generation: int  # 0 = пробанд, 1 = родители, -1 = дети
@@ -28,7 +29,7 @@ class GenerationData:
     year_range: Tuple[int, int]
 
 
-@dataclass
+@dataclass(slots=True)
 class ParenthoodStats:
     """Статистика родительства."""
     person: Person
@@ -36,6 +37,51 @@ class ParenthoodStats:
     age_at_last_child: Optional[int]
     num_children: int
     children_years: List[int]
+    children_key: Tuple[int, ...]  # ключ семьи для дедупликации (отсортированные года детей)
+
+
+@dataclass(slots=True)
+class IntervalStats:
+    """
+    Накопитель статистики по целым интервалам.
+    Хранит только частоты значений (интервалы ограничены 10-70 годами),
+    поэтому среднее и медиана точные, а память не растёт с размером древа.
+    """
+    counts: Counter = field(default_factory=Counter)
+    n: int = 0
+    total: int = 0
+
+    def append(self, value: int):
+        self.counts[value] += 1
+        self.n += 1
+        self.total += value
+
+    def __len__(self) -> int:
+        return self.n
+
+    def mean(self) -> float:
+        return self.total / self.n
+
+    def median(self) -> float:
+        # Проходим значения по возрастанию до середины выборки
+        lower_idx = (self.n - 1) // 2
+        upper_idx = self.n // 2
+        lower = upper = None
+        seen = 0
+        for value in sorted(self.counts):
+            seen += self.counts[value]
+            if lower is None and seen > lower_idx:
+                lower = value
+            if seen > upper_idx:
+                upper = value
+                break
+        return (lower + upper) / 2
+
+    def min(self) -> int:
+        return min(self.counts)
+
+    def max(self) -> int:
+        return max(self.counts)
 
 
 def get_birth_year(person: Person) -> Optional[int]:
@@ -61,57 +107,57 @@ def build_generation_tree(data: GedcomData, root_person: Person,
                           max_ancestors: int = 15,
                           max_descendants: int = 10) -> Dict[int, List[Person]]:
     """
-    Построение дерева поколений от заданной персоны.
+    Построение дерева поколений от заданной персоны (обход в ширину).
     Положительные значения — предки (1 = родители, 2 = бабушки/дедушки)
     Отрицательные — потомки (-1 = дети, -2 = внуки)
     """
-    generations = defaultdict(list)
-    generations[0].append(root_person)
-
-    visited_up = {root_person.id}
-    visited_down = {root_person.id}
+    generations = {0: [root_person]}
 
     # Вверх — предки
-    def traverse_up(person: Person, gen: int):
-        if gen > max_ancestors:
-            return
-
-        father, mother = data.get_parents(person)
-
-        if father and father.id not in visited_up:
-            visited_up.add(father.id)
-            generations[gen].append(father)
-            traverse_up(father, gen + 1)
-
-        if mother and mother.id not in visited_up:
-            visited_up.add(mother.id)
-            generations[gen].append(mother)
-            traverse_up(mother, gen + 1)
+    visited = {root_person.id}
+    layer = [root_person]
+    for gen in range(1, max_ancestors + 1):
+        next_layer = []
+        for person in layer:
+            for parent in data.get_parents(person):
+                if parent and parent.id not in visited:
+                    visited.add(parent.id)
+                    next_layer.append(parent)
+        if not next_layer:
+            break
+        generations[gen] = next_layer
+        layer = next_layer
 
     # Вниз — потомки
-    def traverse_down(person: Person, gen: int):
-        if gen < -max_descendants:
-            return
-
-        children = data.get_children(person)
-        for child in children:
-            if child.id not in visited_down:
-                visited_down.add(child.id)
-                generations[gen].append(child)
-                traverse_down(child, gen - 1)
-
-    traverse_up(root_person, 1)
-    traverse_down(root_person, -1)
-
-    return dict(generations)
+    visited = {root_person.id}
+    layer = [root_person]
+    for gen in range(1, max_descendants + 1):
+        next_layer = []
+        for person in layer:
+            for child in data.get_children(person):
+                if child.id not in visited:
+                    visited.add(child.id)
+                    next_layer.append(child)
+        if not next_layer:
+            break
+        generations[-gen] = next_layer
+        layer = next_layer
+
+    return generations
 
 
 def analyze_generations(generations: Dict[int, List[Person]], data: GedcomData) -> List[GenerationData]:
     """Анализ данных по поколениям."""
     results = []
-
-    for gen_num in sorted(generations.keys(), reverse=True):
-        persons = generations[gen_num]
+    if not generations:
+        return results
+
+    # Слои идут без пропусков (обход в ширину), поэтому вместо сортировки
+    # ключей просто проходим номера от старших предков к младшим потомкам
+    for gen_num in range(max(generations), min(generations) - 1, -1):
+        persons = generations.get(gen_num)
+        if persons is None:
+            continue
 
         birth_years = [get_birth_year(p) for p in persons if get_birth_year(p)]
 
@@ -131,19 +177,21 @@ def analyze_generations(generations: Dict[int, List[Person]], data: GedcomData)
 def calculate_all_intervals(data: GedcomData, before_year: Optional[int] = None) -> Dict:
     """Расчёт всех интервалов между поколениями."""
     intervals = {
-        'father_son': [],
-        'father_daughter': [],
-        'mother_son': [],
-        'mother_daughter': [],
-        'all': [],
+        'father_son': IntervalStats(),
+        'father_daughter': IntervalStats(),
+        'mother_son': IntervalStats(),
+        'mother_daughter': IntervalStats(),
+        'all': IntervalStats(),
     }
 
-    for family_id, family in data.families.items():
-        father = data.get_person(family.husband_id) if family.husband_id else None
-        mother = data.get_person(family.wife_id) if family.wife_id else None
+    get_person = data.get_person
+
+    for family in data.families.values():
+        father = get_person(family.husband_id) if family.husband_id else None
+        mother = get_person(family.wife_id) if family.wife_id else None
 
         for child_id in family.children_ids:
-            child = data.get_person(child_id)
+            child = get_person(child_id)
             if not child:
                 continue
 
@@ -177,16 +225,18 @@ def analyze_parenthood(data: GedcomData, before_year: Optional[int] = None) -> D
     stats = {
         'fathers': [],
         'mothers': [],
-        'first_child_age_fathers': [],
-        'first_child_age_mothers': [],
-        'last_child_age_fathers': [],
-        'last_child_age_mothers': [],
-        'family_sizes': [],
+        'first_child_age_fathers': array('i'),
+        'first_child_age_mothers': array('i'),
+        'last_child_age_fathers': array('i'),
+        'last_child_age_mothers': array('i'),
+        'family_sizes': array('i'),
     }
 
-    for family_id, family in data.families.items():
-        father = data.get_person(family.husband_id) if family.husband_id else None
-        mother = data.get_person(family.wife_id) if family.wife_id else None
+    get_person = data.get_person
+
+    for family in data.families.values():
+        father = get_person(family.husband_id) if family.husband_id else None
+        mother = get_person(family.wife_id) if family.wife_id else None
 
         if not family.children_ids:
             continue
@@ -194,7 +244,7 @@ def analyze_parenthood(data: GedcomData, before_year: Optional[int] = None) -> D
         # Получаем года рождения детей
         children_years = []
         for child_id in family.children_ids:
-            child = data.get_person(child_id)
+            child = get_person(child_id)
             if child:
                 year = get_birth_year(child)
                 if year:
@@ -205,10 +255,12 @@ def analyze_parenthood(data: GedcomData, before_year: Optional[int] = None) -> D
         if not children_years:
             continue
 
+        # Одна сортировка нужна для ключа семьи, крайние года берём из неё же
         children_years.sort()
-        first_child_year = min(children_years)
-        last_child_year = max(children_years)
+        first_child_year = children_years[0]
+        last_child_year = children_years[-1]
         num_children = len(children_years)
+        children_key = tuple(children_years)
 
         stats['family_sizes'].append(num_children)
 
@@ -229,7 +281,8 @@ def analyze_parenthood(data: GedcomData, before_year: Optional[int] = None) -> D
                     age_at_first_child=first_age if 15 <= first_age <= 70 else None,
                     age_at_last_child=last_age if 15 <= last_age <= 80 else None,
                     num_children=num_children,
-                    children_years=children_years
+                    children_years=children_years,
+                    children_key=children_key
                 ))
 
         # Мать
@@ -249,7 +302,8 @@ def analyze_parenthood(data: GedcomData, before_year: Optional[int] = None) -> D
                     age_at_first_child=first_age if 12 <= first_age <= 50 else None,
                     age_at_last_child=last_age if 12 <= last_age <= 55 else None,
                     num_children=num_children,
-                    children_years=children_years
+                    children_years=children_years,
+                    children_key=children_key
                 ))
 
     return stats
@@ -341,10 +395,10 @@ def main():
     if intervals['all']:
         all_int = intervals['all']
         output_lines.append(f"\n   Всего пар родитель-ребёнок: {len(all_int)}")
-        output_lines.append(f"   Средний интервал: {statistics.mean(all_int):.1f} лет")
-        output_lines.append(f"   Медианный интервал: {statistics.median(all_int):.1f} лет")
-        output_lines.append(f"   Минимум: {min(all_int)} лет")
-        output_lines.append(f"   Максимум: {max(all_int)} лет")
+        output_lines.append(f"   Средний интервал: {all_int.mean():.1f} лет")
+        output_lines.append(f"   Медианный интервал: {all_int.median():.1f} лет")
+        output_lines.append(f"   Минимум: {all_int.min()} лет")
+        output_lines.append(f"   Максимум: {all_int.max()} лет")
 
         # По типам
         type_names = {
@@ -358,7 +412,7 @@ def main():
         for key, name in type_names.items():
             data_list = intervals[key]
             if data_list:
-                output_lines.append(f"      {name}: {statistics.mean(data_list):.1f} лет "
+                output_lines.append(f"      {name}: {data_list.mean():.1f} лет "
                                    f"(n={len(data_list)})")
 
     # Статистика родительства
@@ -416,19 +470,13 @@ def main():
             output_lines.append(f"      {size:>2} детей: {bar} {count} ({pct:.1f}%)")
 
         # Многодетные семьи
-        large_families = [(p, p.num_children) for p in parent_stats['fathers'] + parent_stats['mothers']
-                         if p.num_children >= 8]
+        # Убираем дубликаты по семье (отец и мать дают одинаковый ключ)
+        large_families = {}
+        for p in parent_stats['fathers'] + parent_stats['mothers']:
+            if p.num_children >= 8:
+                large_families.setdefault(p.children_key, (p, p.num_children))
         if large_families:
-            # Убираем дубликаты по семье
-            seen = set()
-            unique_large = []
-            for p, n in large_families:
-                key = tuple(sorted(p.children_years))
-                if key not in seen:
-                    seen.add(key)
-                    unique_large.append((p, n))
-
-            unique_large.sort(key=lambda x: -x[1])
+            unique_large = sorted(large_families.values(), key=lambda x: -x[1])
 
             output_lines.append(f"\n   🏆 Многодетные семьи (8+ детей): {len(unique_large)}")
             for p, n in unique_large[:10]:
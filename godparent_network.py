@@ -12,13 +12,25 @@ import sys
 import argparse
 from dataclasses import dataclass
 from typing import Optional, List, Dict, Set, Tuple
-from collections import defaultdict
+from collections import defaultdict, Counter
 
 sys.path.insert(0, '.')
 from lib import parse_gedcom, Person, Family, GedcomData
 
 
-@dataclass
+# Общие экземпляры строк для типов крёстных и степеней родства —
+# все связи ссылаются на один объект вместо собственной копии строки
+GODFATHER = sys.intern('godfather')
+GODMOTHER = sys.intern('godmother')
+
+REL_SIBLING = sys.intern("сиблинги")
+REL_FATHER = sys.intern("отец")
+REL_MOTHER = sys.intern("мать")
+REL_CHILD = sys.intern("ребёнок")
+REL_SPOUSE = sys.intern("супруг(а)")
+
+
+@dataclass(slots=True, frozen=True)
 class GodparentRelation:
     """Связь крёстный-крестник."""
     godparent: Person
@@ -41,31 +53,28 @@ def find_godparents(person: Person, data: GedcomData) -> List[Tuple[Person, str]
     godparents = []
 
     # В GEDCOM крёстные записываются через ASSO с RELA godparent/godfather/godmother
-    if hasattr(person, 'associations') and person.associations:
-        for assoc in person.associations:
-            if hasattr(assoc, 'relation') and assoc.relation:
-                rel = assoc.relation.lower()
-                if 'godfather' in rel or 'крёстн' in rel and 'отец' in rel:
-                    gp = data.get_person(assoc.person_id) if hasattr(assoc, 'person_id') else None
-                    if gp:
-                        godparents.append((gp, 'godfather'))
-                elif 'godmother' in rel or 'крёстн' in rel and 'мать' in rel:
-                    gp = data.get_person(assoc.person_id) if hasattr(assoc, 'person_id') else None
-                    if gp:
-                        godparents.append((gp, 'godmother'))
-                elif 'godparent' in rel or 'крёстн' in rel:
-                    gp = data.get_person(assoc.person_id) if hasattr(assoc, 'person_id') else None
-                    if gp:
-                        gp_type = 'godfather' if gp.sex == 'M' else 'godmother'
-                        godparents.append((gp, gp_type))
-
-    # Также проверяем notes на упоминания крёстных
-    if hasattr(person, 'notes') and person.notes:
-        notes = person.notes if isinstance(person.notes, list) else [person.notes]
-        for note in notes:
-            if note and 'крёстн' in note.lower():
-                # Пытаемся извлечь имена (простой паттерн)
-                pass  # Сложный парсинг, оставляем для будущего
+    # (RELA приводится к нижнему регистру при разборе)
+    for assoc in person.associations:
+        rel = assoc.relation
+        if not rel:
+            continue
+        # Порядок проверок задаёт приоритет: крёстный отец, крёстная мать,
+        # затем крёстный без уточнения (тип по полу)
+        if 'godfather' in rel or 'крёстн' in rel and 'отец' in rel:
+            gp_type = GODFATHER
+        elif 'godmother' in rel or 'крёстн' in rel and 'мать' in rel:
+            gp_type = GODMOTHER
+        elif 'godparent' in rel or 'крёстн' in rel:
+            gp_type = None
+        else:
+            continue
+
+        gp = data.get_person(assoc.person_id) if assoc.person_id else None
+        if not gp:
+            continue
+        if gp_type is None:
+            gp_type = GODFATHER if gp.sex == 'M' else GODMOTHER
+        godparents.append((gp, gp_type))
 
     return godparents
 
@@ -86,37 +95,57 @@ def find_godchildren(person: Person, data: GedcomData) -> List[Person]:
 def is_relative(person1: Person, person2: Person, data: GedcomData) -> Tuple[bool, Optional[str]]:
     """Проверить, являются ли персоны родственниками."""
     # Простая проверка — одна семья
-    if person1.child_family_id and person2.child_family_id:
-        if person1.child_family_id == person2.child_family_id:
-            return True, "сиблинги"
+    if person1.famc and person2.famc:
+        if person1.famc == person2.famc:
+            return True, REL_SIBLING
 
     # Проверяем родителей
-    if person1.child_family_id:
-        family = data.families.get(person1.child_family_id)
+    if person1.famc:
+        family = data.families.get(person1.famc)
         if family:
             if family.husband_id == person2.id:
-                return True, "отец"
+                return True, REL_FATHER
             if family.wife_id == person2.id:
-                return True, "мать"
+                return True, REL_MOTHER
 
-    if person2.child_family_id:
-        family = data.families.get(person2.child_family_id)
+    if person2.famc:
+        family = data.families.get(person2.famc)
         if family:
             if family.husband_id == person1.id:
-                return True, "ребёнок"
+                return True, REL_CHILD
             if family.wife_id == person1.id:
-                return True, "ребёнок"
+                return True, REL_CHILD
 
     # Проверяем супругов
-    for fam_id in (person1.spouse_family_ids or []):
+    for fam_id in person1.fams:
         family = data.families.get(fam_id)
         if family:
             if family.husband_id == person2.id or family.wife_id == person2.id:
-                return True, "супруг(а)"
+                return True, REL_SPOUSE
 
     return False, None
 
 
+def classify_godparents(person: Person, data: GedcomData) -> List[GodparentRelation]:
+    """
+    Связи персоны с её крёстными.
+    Только читает данные древа, поэтому персоны можно обрабатывать независимо.
+    """
+    birth_year = get_birth_year(person)
+    relations = []
+    for godparent, gp_type in find_godparents(person, data):
+        is_rel, rel_type = is_relative(godparent, person, data)
+        relations.append(GodparentRelation(
+            godparent=godparent,
+            godchild=person,
+            godparent_type=gp_type,
+            year=birth_year,
+            is_relative=is_rel,
+            relationship=rel_type
+        ))
+    return relations
+
+
 def analyze_godparent_network(data: GedcomData) -> Dict:
     """Анализ сети крёстных."""
     stats = {
@@ -128,7 +157,7 @@ def analyze_godparent_network(data: GedcomData) -> Dict:
         'godchildren_count': defaultdict(int),  # сколько крёстных у каждого
         'relative_godparents': 0,
         'non_relative_godparents': 0,
-        'by_decade': defaultdict(lambda: {'total': 0, 'relative': 0}),
+        'by_decade': {},
         'top_godparents': [],
         'network_clusters': [],
     }
@@ -136,32 +165,28 @@ def analyze_godparent_network(data: GedcomData) -> Dict:
     all_godparents = set()
     all_godchildren = set()
 
+    # Десятилетия связей — считаем одним проходом после основного цикла
+    decades_total = []
+    decades_relative = []
+
     for person_id, person in data.persons.items():
         stats['total_persons'] += 1
 
-        godparents = find_godparents(person, data)
-        if not godparents:
+        relations = classify_godparents(person, data)
+        if not relations:
             continue
 
         stats['with_godparents'] += 1
         birth_year = get_birth_year(person)
         decade = (birth_year // 10) * 10 if birth_year else None
 
-        for godparent, gp_type in godparents:
+        for relation in relations:
             stats['total_relations'] += 1
-
-            is_rel, rel_type = is_relative(godparent, person, data)
-
-            relation = GodparentRelation(
-                godparent=godparent,
-                godchild=person,
-                godparent_type=gp_type,
-                year=birth_year,
-                is_relative=is_rel,
-                relationship=rel_type
-            )
             stats['relations'].append(relation)
 
+            godparent = relation.godparent
+            is_rel = relation.is_relative
+
             stats['godparents_count'][godparent.id] += 1
             stats['godchildren_count'][person.id] += 1
 
@@ -174,9 +199,16 @@ def analyze_godparent_network(data: GedcomData) -> Dict:
                 stats['non_relative_godparents'] += 1
 
             if decade:
-                stats['by_decade'][decade]['total'] += 1
+                decades_total.append(decade)
                 if is_rel:
-                    stats['by_decade'][decade]['relative'] += 1
+                    decades_relative.append(decade)
+
+    totals = Counter(decades_total)
+    relatives = Counter(decades_relative)
+    stats['by_decade'] = {
+        decade: {'total': total, 'relative': relatives[decade]}
+        for decade, total in totals.items()
+    }
 
     # Топ крёстных (больше всего крестников)
     top_gp = sorted(stats['godparents_count'].items(), key=lambda x: -x[1])
@@ -232,14 +264,13 @@ def main():
             output_lines.append(f"🔍 АНАЛИЗ ПЕРСОНЫ: {person.name}")
             output_lines.append("=" * 100)
 
-            godparents = find_godparents(person, data)
-            if godparents:
+            relations = classify_godparents(person, data)
+            if relations:
                 output_lines.append(f"\n   Крёстные {person.name}:")
-                for gp, gp_type in godparents:
-                    type_str = "крёстный отец" if gp_type == 'godfather' else "крёстная мать"
-                    is_rel, rel_type = is_relative(gp, person, data)
-                    rel_str = f" ({rel_type})" if is_rel else ""
-                    output_lines.append(f"      {type_str}: {gp.name}{rel_str}")
+                for rel in relations:
+                    type_str = "крёстный отец" if rel.godparent_type == GODFATHER else "крёстная мать"
+                    rel_str = f" ({rel.relationship})" if rel.is_relative else ""
+                    output_lines.append(f"      {type_str}: {rel.godparent.name}{rel_str}")
 
             godchildren = find_godchildren(person, data)
             if godchildren:
@@ -256,11 +287,16 @@ def main():
         output_lines.append("👨‍👩‍👧 ТОП КРЁСТНЫХ (больше всего крестников)")
         output_lines.append("=" * 100)
 
+        # Группируем связи по крёстному один раз, а не для каждого из топа
+        relations_by_godparent = defaultdict(list)
+        for rel in stats['relations']:
+            relations_by_godparent[rel.godparent.id].append(rel)
+
         for gp, count in stats['top_godparents']:
             output_lines.append(f"\n   {gp.name}: {count} крестников")
 
             # Показываем крестников
-            godchildren = [r for r in stats['relations'] if r.godparent.id == gp.id]
+            godchildren = relations_by_godparent[gp.id]
             for rel in godchildren[:5]:
                 by = get_birth_year(rel.godchild)
                 rel_str = f" ({rel.relationship})" if rel.is_relative else ""
@@ -292,14 +328,15 @@ def main():
             decade = (rel.year // 10) * 10 if rel.year else None
             by_decade[decade].append(rel)
 
-        for decade in sorted(by_decade.keys()):
+        # Связи без даты выводятся после всех десятилетий
+        for decade in sorted(by_decade.keys(), key=lambda d: (d is None, d or 0)):
             if decade:
                 output_lines.append(f"\n   {decade}s:")
             else:
                 output_lines.append(f"\n   Без даты:")
 
             for rel in by_decade[decade][:10]:
-                gp_type = "⬆️" if rel.godparent_type == 'godfather' else "⬇️"
+                gp_type = "⬆️" if rel.godparent_type == GODFATHER else "⬇️"
                 rel_str = f" [{rel.relationship}]" if rel.is_relative else ""
                 output_lines.append(f"      {gp_type} {rel.godparent.name} → {rel.godchild.name}{rel_str}")
 
@@ -11,8 +11,8 @@
 
 import sys
 import argparse
-from dataclasses import dataclass
-from typing import Optional, List, Dict, Set, Tuple
+from dataclasses import dataclass, field
+from typing import Optional, List, Dict, Tuple
 from collections import defaultdict
 
 sys.path.insert(0, '.')
@@ -46,57 +46,266 @@ def find_ancestors_with_paths(person: Person, data: GedcomData,
     Возвращает {ancestor_id: [список путей до этого предка]}.
     """
     ancestors = defaultdict(list)
+    # Персоны на текущем пути от исходной (защита от циклов в данных)
+    visited = set()
+    # Явный стек вместо рекурсии: (персона, поколение, выход_из_персоны)
+    stack = [(person, 0, False)]
+
+    while stack:
+        current, generation, leaving = stack.pop()
+        if leaving:
+            visited.remove(current.id)
+            continue
 
-    def traverse(current: Person, generation: int, visited: Set[str]):
-        if generation > max_generations:
-            return
-        if current.id in visited:
-            return
+        if generation > 0:
+            ancestors[current.id].append(generation)
+        if generation > max_generations or current.id in visited:
+            continue
 
         visited.add(current.id)
+        stack.append((current, generation, True))
 
+        # Мать кладётся первой, чтобы отец обходился раньше
         father, mother = data.get_parents(current)
-
-        if father:
-            ancestors[father.id].append(generation + 1)
-            traverse(father, generation + 1, visited.copy())
-
         if mother:
-            ancestors[mother.id].append(generation + 1)
-            traverse(mother, generation + 1, visited.copy())
+            stack.append((mother, generation + 1, False))
+        if father:
+            stack.append((father, generation + 1, False))
 
-    traverse(person, 0, set())
     return dict(ancestors)
 
 
-def find_ancestors_recursive(person: Person, data: GedcomData,
-                              generation: int, max_gen: int,
-                              path: List[str]) -> List[Tuple[str, int, List[str]]]:
+# Сколько кратчайших путей до одного предка учитывать по умолчанию
+DEFAULT_MAX_PATHS = 32
+
+
+@dataclass(slots=True)
+class AncestorIndex:
     """
-    Рекурсивный поиск предков с сохранением полного пути.
-    Возвращает [(ancestor_id, generation, path), ...]
+    Данные для обхода предков на один прогон анализа (одна глубина поиска).
+    person_idx — плотная нумерация персон: путь хранится битовой маской
+    из этих номеров, и проверка пересечения путей — одно побитовое И.
+    depths — {person_id: {ancestor_id: min_generation}} в пределах глубины
+    поиска; позволяет отбросить неродственные пары без перебора путей.
+    max_paths — сколько кратчайших путей до одного предка учитывать
+    (None — все пути).
     """
-    if generation > max_gen:
-        return []
+    person_idx: Dict[str, int]
+    max_generations: int
+    max_paths: Optional[int] = DEFAULT_MAX_PATHS
+    depths: Optional[Dict[str, Dict[str, int]]] = None
+    fingerprints: Optional[Dict[str, int]] = None  # 256-битные фильтры Блума по depths
+    paths: Dict[str, Dict[str, List[Tuple[int, int]]]] = field(default_factory=dict)
+    pow_half: List[float] = field(default_factory=list)  # pow_half[n1 + n2] = 0.5^(n1 + n2 + 1)
+
+
+def build_ancestor_depths(data: GedcomData, limit: int) -> Dict[str, Dict[str, int]]:
+    """
+    Предки каждой персоны с минимальным числом поколений (не дальше limit).
+    Один проход от старших поколений к младшим (алгоритм Кана):
+    предки персоны — её родители плюс предки родителей на поколение дальше.
+    Персоны из циклов в данных в результат не попадают.
+    """
+    pedigree = data.pedigree()
+    ids = pedigree.ids
+    parents_of = {}
+    children_of = defaultdict(list)
+    pending = {}
+    for i, person_id in enumerate(ids):
+        parents = tuple(ids[p] for p in (pedigree.fathers[i], pedigree.mothers[i]) if p >= 0)
+        parents_of[person_id] = parents
+        pending[person_id] = len(parents)
+        for parent_id in parents:
+            children_of[parent_id].append(person_id)
+
+    depths = {}
+    queue = [person_id for person_id, count in pending.items() if count == 0]
+    for person_id in queue:
+        merged = {}
+        for parent_id in parents_of[person_id]:
+            merged[parent_id] = 1
+            for anc_id, depth in depths[parent_id].items():
+                if depth < limit and depth + 1 < merged.get(anc_id, limit + 1):
+                    merged[anc_id] = depth + 1
+        depths[person_id] = merged
+
+        for child_id in children_of[person_id]:
+            pending[child_id] -= 1
+            if pending[child_id] == 0:
+                queue.append(child_id)
+
+    return depths
+
+
+def build_ancestor_fingerprints(depths: Dict[str, Dict[str, int]],
+                                person_idx: Dict[str, int]) -> Dict[str, int]:
+    """
+    Фильтр Блума (256 бит) по множеству предков каждой персоны.
+    Пустое пересечение отпечатков двух персон гарантирует отсутствие общих
+    предков; непустое — только возможность (проверяется дальше точно).
+    """
+    fingerprints = {}
+    for person_id, ancestors in depths.items():
+        fingerprint = 0
+        for anc_id in ancestors:
+            # Мультипликативное хеширование номера персоны в один из 256 битов
+            fingerprint |= 1 << (((person_idx[anc_id] * 2654435761) & 0xFFFFFFFF) >> 24)
+        fingerprints[person_id] = fingerprint
+    return fingerprints
+
+
+def build_ancestor_index(data: GedcomData, max_generations: int = 10,
+                         with_depths: bool = True,
+                         max_paths: Optional[int] = DEFAULT_MAX_PATHS) -> AncestorIndex:
+    """Индекс для анализа всего древа (with_depths=False — для одной персоны)."""
+    person_idx = data.pedigree().index
+    # Пути из get_ancestor_paths доходят до max_generations + 1 поколений
+    depths = build_ancestor_depths(data, max_generations + 1) if with_depths else None
+    return AncestorIndex(
+        person_idx=person_idx,
+        max_generations=max_generations,
+        max_paths=max_paths,
+        depths=depths,
+        fingerprints=build_ancestor_fingerprints(depths, person_idx) if with_depths else None,
+        # n1, n2 <= max_generations + 1
+        pow_half=[0.5 ** (n + 1) for n in range(2 * max_generations + 3)],
+    )
+
+
+def may_share_ancestors(person1: Person, person2: Person, index: AncestorIndex) -> bool:
+    """Быстрая проверка по отпечаткам: False — общих предков точно нет."""
+    if index.fingerprints is None:
+        return True
+    fp1 = index.fingerprints.get(person1.id)
+    fp2 = index.fingerprints.get(person2.id)
+    if fp1 is None or fp2 is None:
+        return True
+    return bool(fp1 & fp2)
 
-    results = []
-    father, mother = data.get_parents(person)
 
-    if father:
-        new_path = path + [father.id]
-        results.append((father.id, generation + 1, new_path))
-        results.extend(find_ancestors_recursive(father, data, generation + 1, max_gen, new_path))
+def get_ancestor_ids(person: Person, data: GedcomData, index: AncestorIndex):
+    """ID предков персоны в пределах глубины поиска (словарь с ID в ключах)."""
+    if index.depths is not None:
+        depths = index.depths.get(person.id)
+        if depths is not None:
+            return depths
+    return get_ancestor_paths(person, data, index)
 
-    if mother:
-        new_path = path + [mother.id]
-        results.append((mother.id, generation + 1, new_path))
-        results.extend(find_ancestors_recursive(mother, data, generation + 1, max_gen, new_path))
 
-    return results
+def has_common_ancestors(person1: Person, person2: Person, data: GedcomData,
+                         index: AncestorIndex) -> bool:
+    """Есть ли у двух персон общий предок в пределах глубины поиска."""
+    ancestors1 = get_ancestor_ids(person1, data, index)
+    ancestors2 = get_ancestor_ids(person2, data, index)
+    # isdisjoint не строит пересечение и останавливается на первом совпадении
+    return not ancestors1.keys().isdisjoint(ancestors2)
+
+
+def get_ancestor_paths(person: Person, data: GedcomData,
+                       index: AncestorIndex) -> Dict[str, List[Tuple[int, int]]]:
+    """
+    Пути до предков персоны, сгруппированные по ID предка.
+    Возвращает {ancestor_id: [(generation, path_mask), ...]}, где path_mask —
+    маска персон на пути без самого предка.
+
+    Если путей до предка больше index.max_paths, остаются только кратчайшие:
+    вклад длинных путей в COI мал, а перебор пар растёт квадратично.
+
+    Результат кэшируется в index: у сиблингов общие родители, а супруг
+    встречается в нескольких браках, поэтому предков каждой персоны
+    достаточно обойти один раз.
+    """
+    cached = index.paths.get(person.id)
+    if cached is not None:
+        return cached
+
+    # Обход в глубину с явным стеком (отец раньше матери) по массивам номеров
+    # родителей, до max_generations + 1 поколений: маска пути наращивается
+    # по ходу, без кортежей ID и объектов Person
+    pedigree = data.pedigree()
+    ids, fathers, mothers = pedigree.ids, pedigree.fathers, pedigree.mothers
+    max_generations = index.max_generations
+
+    start = index.person_idx[person.id]
+    root_mask = 1 << start
+    stack = []
+    if mothers[start] >= 0:
+        stack.append((mothers[start], 1, root_mask))
+    if fathers[start] >= 0:
+        stack.append((fathers[start], 1, root_mask))
+
+    paths = defaultdict(list)
+    while stack:
+        idx, gen, mask = stack.pop()
+        paths[ids[idx]].append((gen, mask))
+
+        if gen > max_generations:
+            continue
+        child_mask = mask | (1 << idx)
+        if mothers[idx] >= 0:
+            stack.append((mothers[idx], gen + 1, child_mask))
+        if fathers[idx] >= 0:
+            stack.append((fathers[idx], gen + 1, child_mask))
+    paths = dict(paths)
+
+    max_paths = index.max_paths
+    if max_paths:
+        for anc_id, entries in paths.items():
+            if len(entries) > max_paths:
+                entries.sort(key=lambda entry: entry[0])
+                del entries[max_paths:]
+
+    index.paths[person.id] = paths
+    return paths
+
+
+def ancestor_contribution(father_entries: List[Tuple[int, int]],
+                          mother_entries: List[Tuple[int, int]],
+                          pow_half: List[float]) -> Tuple[float, Optional[Tuple[float, int, int]]]:
+    """
+    Вклад одного общего предка в COI: сумма (0.5)^(n1 + n2 + 1) по всем
+    парам непересекающихся путей от отца и от матери.
+    Работает только с целыми (поколение, маска пути) и не обращается к древу;
+    степени берутся из таблицы pow_half (см. AncestorIndex).
+    Возвращает (вклад, (вклад_пары, n1, n2) ближайшей пары или None).
+    """
+    # Если ни один путь от отца не пересекается ни с одним путём от матери,
+    # сумма по всем парам раскладывается в произведение сумм:
+    # Σ 0.5^(n1 + n2 + 1) = 0.5 * Σ 0.5^n1 * Σ 0.5^n2
+    f_union = 0
+    for _, f_mask in father_entries:
+        f_union |= f_mask
+    m_union = 0
+    for _, m_mask in mother_entries:
+        m_union |= m_mask
+    if not f_union & m_union:
+        f_sum = sum(pow_half[f_gen - 1] for f_gen, _ in father_entries)
+        m_sum = sum(pow_half[m_gen - 1] for m_gen, _ in mother_entries)
+        f_min = min(f_gen for f_gen, _ in father_entries)
+        m_min = min(m_gen for m_gen, _ in mother_entries)
+        return 0.5 * f_sum * m_sum, (pow_half[f_min + m_min], f_min, m_min)
+
+    total = 0.0
+    closest = None
+
+    for f_gen, f_mask in father_entries:
+        for m_gen, m_mask in mother_entries:
+            # Проверяем, что пути не пересекаются (кроме самого предка)
+            if f_mask & m_mask:
+                continue  # Пути пересекаются - не считаем
+
+            contribution = pow_half[f_gen + m_gen]
+            total += contribution
+            if closest is None or contribution > closest[0]:
+                closest = (contribution, f_gen, m_gen)
+
+    return total, closest
 
 
 def calculate_coi(person: Person, data: GedcomData,
-                  max_generations: int = 10) -> InbreedingResult:
+                  max_generations: int = 10,
+                  index: Optional[AncestorIndex] = None,
+                  max_paths: Optional[int] = DEFAULT_MAX_PATHS) -> InbreedingResult:
     """
     Расчёт коэффициента инбридинга по формуле Райта.
 
@@ -119,21 +328,21 @@ def calculate_coi(person: Person, data: GedcomData,
             relationship_description="Нет данных о родителях"
         )
 
-    # Находим предков отца и матери
-    father_ancestors = find_ancestors_recursive(father, data, 0, max_generations, [father.id])
-    mother_ancestors = find_ancestors_recursive(mother, data, 0, max_generations, [mother.id])
+    if index is None:
+        index = build_ancestor_index(data, max_generations, with_depths=False,
+                                     max_paths=max_paths)
 
-    # Группируем по ID предка
-    father_paths = defaultdict(list)
-    for anc_id, gen, path in father_ancestors:
-        father_paths[anc_id].append((gen, path))
+    # Неродственные родители отсекаются по отпечаткам и предвычисленным предкам
+    if (may_share_ancestors(father, mother, index)
+            and has_common_ancestors(father, mother, data, index)):
+        # Находим предков отца и матери (сгруппированы по ID предка)
+        father_paths = get_ancestor_paths(father, data, index)
+        mother_paths = get_ancestor_paths(mother, data, index)
 
-    mother_paths = defaultdict(list)
-    for anc_id, gen, path in mother_ancestors:
-        mother_paths[anc_id].append((gen, path))
-
-    # Находим общих предков
-    common_ancestor_ids = set(father_paths.keys()) & set(mother_paths.keys())
+        # Находим общих предков
+        common_ancestor_ids = set(father_paths.keys()) & set(mother_paths.keys())
+    else:
+        common_ancestor_ids = set()
 
     if not common_ancestor_ids:
         return InbreedingResult(
@@ -154,36 +363,22 @@ def calculate_coi(person: Person, data: GedcomData,
         if not ancestor:
             continue
 
-        # Для каждой комбинации путей
-        for f_gen, f_path in father_paths[anc_id]:
-            for m_gen, m_path in mother_paths[anc_id]:
-                # Проверяем, что пути не пересекаются (кроме самого предка)
-                f_set = set(f_path[:-1])  # без общего предка
-                m_set = set(m_path[:-1])
-
-                if f_set & m_set:
-                    continue  # Пути пересекаются - не считаем
-
-                # Вклад этого предка: (0.5)^(n1 + n2 + 1)
-                contribution = (0.5) ** (f_gen + m_gen + 1)
-                coi += contribution
-
-                common_ancestors.append(CommonAncestor(
-                    ancestor=ancestor,
-                    path_from_father=f_gen,
-                    path_from_mother=m_gen,
-                    contribution=contribution
-                ))
-
-    # Убираем дубликаты предков, оставляя ближайший путь
-    unique_ancestors = {}
-    for ca in common_ancestors:
-        key = ca.ancestor.id
-        if key not in unique_ancestors or ca.contribution > unique_ancestors[key].contribution:
-            unique_ancestors[key] = ca
-
-    common_ancestors = sorted(unique_ancestors.values(),
-                               key=lambda x: -x.contribution)
+        total, closest = ancestor_contribution(father_paths[anc_id], mother_paths[anc_id],
+                                                index.pow_half)
+        if closest is None:
+            continue  # Все пары путей пересекаются
+
+        coi += total
+        # Для отчёта по предку оставляем ближайшую пару путей
+        contribution, f_gen, m_gen = closest
+        common_ancestors.append(CommonAncestor(
+            ancestor=ancestor,
+            path_from_father=f_gen,
+            path_from_mother=m_gen,
+            contribution=contribution
+        ))
+
+    common_ancestors.sort(key=lambda x: -x.contribution)
 
     # Описание родства
     relationship = describe_relationship(common_ancestors, data)
@@ -198,6 +393,17 @@ def calculate_coi(person: Person, data: GedcomData,
     )
 
 
+# Типичные отношения: (меньшее, большее) число поколений до общего предка
+RELATIONSHIPS = {
+    (1, 1): "Родители — родные брат и сестра",
+    (1, 2): "Отец — дядя/тётя матери",
+    (2, 2): "Родители — двоюродные брат и сестра",
+    (2, 3): "Родители — троюродные брат и сестра (через поколение)",
+    (3, 3): "Родители — троюродные брат и сестра",
+    (4, 4): "Родители — четвероюродные брат и сестра",
+}
+
+
 def describe_relationship(common_ancestors: List[CommonAncestor], data: GedcomData) -> str:
     """Описание степени родства."""
     if not common_ancestors:
@@ -207,21 +413,9 @@ def describe_relationship(common_ancestors: List[CommonAncestor], data: GedcomDa
     n1 = closest.path_from_father
     n2 = closest.path_from_mother
 
-    # Типичные отношения
-    relationships = {
-        (1, 1): "Родители — родные брат и сестра",
-        (1, 2): "Отец — дядя/тётя матери",
-        (2, 1): "Мать — дядя/тётя отца",
-        (2, 2): "Родители — двоюродные брат и сестра",
-        (2, 3): "Родители — троюродные брат и сестра (через поколение)",
-        (3, 2): "Родители — троюродные брат и сестра (через поколение)",
-        (3, 3): "Родители — троюродные брат и сестра",
-        (4, 4): "Родители — четвероюродные брат и сестра",
-    }
-
-    key = (min(n1, n2), max(n1, n2))
-    if key in relationships:
-        return relationships[key]
+    description = RELATIONSHIPS.get((min(n1, n2), max(n1, n2)))
+    if description is not None:
+        return description
 
     # Общее описание
     total_gen = n1 + n2
@@ -234,21 +428,25 @@ def describe_relationship(common_ancestors: List[CommonAncestor], data: GedcomDa
 
 
 def analyze_all_persons(data: GedcomData, max_generations: int = 10,
-                         min_coi: float = 0.0) -> List[InbreedingResult]:
+                         min_coi: float = 0.0,
+                         max_paths: Optional[int] = DEFAULT_MAX_PATHS) -> List[InbreedingResult]:
     """Анализ инбридинга для всех персон."""
     results = []
+    index = build_ancestor_index(data, max_generations, max_paths=max_paths)
 
     for person_id, person in data.persons.items():
-        result = calculate_coi(person, data, max_generations)
+        result = calculate_coi(person, data, max_generations, index)
         if result.coi >= min_coi:
             results.append(result)
 
     return sorted(results, key=lambda x: -x.coi)
 
 
-def find_related_marriages(data: GedcomData, max_generations: int = 10) -> List[Tuple[Family, InbreedingResult]]:
+def find_related_marriages(data: GedcomData, max_generations: int = 10,
+                           max_paths: Optional[int] = DEFAULT_MAX_PATHS) -> List[Tuple[Family, InbreedingResult]]:
     """Находит браки между родственниками."""
     related_marriages = []
+    index = build_ancestor_index(data, max_generations, max_paths=max_paths)
 
     for family_id, family in data.families.items():
         if not family.husband_id or not family.wife_id:
@@ -260,23 +458,16 @@ def find_related_marriages(data: GedcomData, max_generations: int = 10) -> List[
         if not husband or not wife:
             continue
 
-        # Находим общих предков супругов
-        husband_ancestors = set()
-        for anc_id, gen, path in find_ancestors_recursive(husband, data, 0, max_generations, [husband.id]):
-            husband_ancestors.add(anc_id)
-
-        wife_ancestors = set()
-        for anc_id, gen, path in find_ancestors_recursive(wife, data, 0, max_generations, [wife.id]):
-            wife_ancestors.add(anc_id)
-
-        common = husband_ancestors & wife_ancestors
+        if not may_share_ancestors(husband, wife, index):
+            continue
 
-        if common:
+        # Есть ли у супругов общие предки
+        if has_common_ancestors(husband, wife, data, index):
             # Берём первого ребёнка для расчёта COI
             if family.children_ids:
                 child = data.get_person(family.children_ids[0])
                 if child:
-                    result = calculate_coi(child, data, max_generations)
+                    result = calculate_coi(child, data, max_generations, index)
                     if result.coi > 0:
                         related_marriages.append((family, result))
 
@@ -294,10 +485,14 @@ def main():
                         help='Максимальная глубина поиска предков (по умолчанию: 10)')
     parser.add_argument('--min-coi', type=float, default=0.001, metavar='X',
                         help='Минимальный COI для отображения (по умолчанию: 0.001 = 0.1%%)')
+    parser.add_argument('--max-paths-per-ancestor', type=int, default=DEFAULT_MAX_PATHS, metavar='K',
+                        help=f'Максимум путей до одного общего предка (по умолчанию: {DEFAULT_MAX_PATHS}, 0 — без ограничения)')
     parser.add_argument('--output', '-o', metavar='FILE',
                         help='Сохранить отчёт в файл')
 
     args = parser.parse_args()
+    if args.max_paths_per_ancestor < 0:
+        parser.error('--max-paths-per-ancestor не может быть отрицательным')
 
     print(f"Парсинг GEDCOM файла: {args.gedcom_file}")
     data = parse_gedcom(args.gedcom_file)
@@ -316,7 +511,8 @@ def main():
             print(f"Ошибка: персона {args.person} не найдена")
             sys.exit(1)
 
-        result = calculate_coi(person, data, args.max_gen)
+        result = calculate_coi(person, data, args.max_gen,
+                               max_paths=args.max_paths_per_ancestor)
 
         output_lines.append(f"\n📊 АНАЛИЗ ДЛЯ: {person.name}")
         output_lines.append(f"   Коэффициент инбридинга (COI): {result.coi_percent:.4f}%")
@@ -335,7 +531,7 @@ def main():
         # Анализ всех
         output_lines.append(f"\n🔍 Поиск браков между родственниками (до {args.max_gen} поколений)...")
 
-        related = find_related_marriages(data, args.max_gen)
+        related = find_related_marriages(data, args.max_gen, args.max_paths_per_ancestor)
 
         if not related:
             output_lines.append("\n✓ Браки между родственниками не обнаружены")
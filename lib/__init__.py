@@ -3,6 +3,8 @@
 """
 
 from .parser import parse_gedcom
-from .models import Person, Family, GedcomData
+from .models import Person, Family, GedcomData, Association
+from .stats import mean, median_sorted, stdev, summarize_sorted
 
-__all__ = ['parse_gedcom', 'Person', 'Family', 'GedcomData']
+__all__ = ['parse_gedcom', 'Person', 'Family', 'GedcomData', 'Association',
+           'mean', 'median_sorted', 'stdev', 'summarize_sorted']
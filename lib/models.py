@@ -2,12 +2,20 @@
 Модели данных для GEDCOM.
 """
 
+from array import array
 from dataclasses import dataclass, field
 from datetime import date
 from typing import Optional, List, Dict, Set
 
 
 @dataclass
+class Association:
+    """Связь с другой персоной (ASSO), например крёстный или свидетель."""
+    person_id: Optional[str] = None
+    relation: str = ""  # RELA в нижнем регистре
+
+
+@dataclass(slots=True)
 class Person:
     """Персона в генеалогическом древе."""
     id: str
@@ -40,6 +48,7 @@ class Person:
     occupation: str = ""
     residence: List[Dict] = field(default_factory=list)  # [{place, date_from, date_to, lat, lon}]
     godparents: List[str] = field(default_factory=list)
+    associations: List[Association] = field(default_factory=list)
     notes: List[str] = field(default_factory=list)
 
     def age_at_death(self) -> Optional[int]:
@@ -58,7 +67,7 @@ class Person:
         return self.death_date is None and self.death_year is None
 
 
-@dataclass
+@dataclass(slots=True)
 class Family:
     """Семья (брак) в генеалогическом древе."""
     id: str
@@ -76,11 +85,79 @@ class Family:
     divorce_date: Optional[date] = None
 
 
+@dataclass
+class PedigreeArrays:
+    """
+    Родословная в виде плоских массивов (структура массивов).
+    Персоны пронумерованы в порядке data.persons; fathers[i] и mothers[i] —
+    номера родителей персоны i или -1. Для обходов предков без обращения
+    к объектам Person.
+    """
+    ids: List[str]
+    index: Dict[str, int]
+    fathers: array
+    mothers: array
+
+
+@dataclass
+class LifeYears:
+    """
+    Годы рождения и смерти по номерам персон (порядок data.persons).
+    Год берётся из полной даты, иначе из *_year; 0 — год неизвестен.
+    """
+    birth_years: array
+    death_years: array
+
+
 @dataclass
 class GedcomData:
     """Полные данные из GEDCOM файла."""
     persons: Dict[str, Person] = field(default_factory=dict)
     families: Dict[str, Family] = field(default_factory=dict)
+    _pedigree: Optional[PedigreeArrays] = field(default=None, init=False, repr=False, compare=False)
+    _life_years: Optional[LifeYears] = field(default=None, init=False, repr=False, compare=False)
+    _parents: Dict[str, tuple] = field(default_factory=dict, init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        if self.persons:
+            self.build_indexes()
+
+    def build_indexes(self):
+        """
+        Индекс родителей {person_id: (отец, мать)} — get_parents становится
+        одним поиском в словаре. Вызывается после загрузки данных.
+        """
+        self._parents = {
+            person_id: self._lookup_parents(person)
+            for person_id, person in self.persons.items()
+        }
+
+    def pedigree(self) -> PedigreeArrays:
+        """Массивы родителей по номерам персон (строятся один раз после загрузки)."""
+        if self._pedigree is None:
+            ids = list(self.persons)
+            index = {person_id: i for i, person_id in enumerate(ids)}
+            fathers = array('i', [-1]) * len(ids)
+            mothers = array('i', [-1]) * len(ids)
+            for i, person_id in enumerate(ids):
+                famc = self.persons[person_id].famc
+                family = self.families.get(famc) if famc else None
+                if family:
+                    fathers[i] = index.get(family.husband_id, -1)
+                    mothers[i] = index.get(family.wife_id, -1)
+            self._pedigree = PedigreeArrays(ids=ids, index=index, fathers=fathers, mothers=mothers)
+        return self._pedigree
+
+    def life_years(self) -> LifeYears:
+        """Массивы годов рождения и смерти (строятся один раз после загрузки)."""
+        if self._life_years is None:
+            births = array('i')
+            deaths = array('i')
+            for person in self.persons.values():
+                births.append((person.birth_date.year if person.birth_date else person.birth_year) or 0)
+                deaths.append((person.death_date.year if person.death_date else person.death_year) or 0)
+            self._life_years = LifeYears(birth_years=births, death_years=deaths)
+        return self._life_years
 
     def get_person(self, person_id: str) -> Optional[Person]:
         """Получить персону по ID."""
@@ -92,6 +169,13 @@ class GedcomData:
 
     def get_parents(self, person: Person) -> tuple:
         """Получить родителей персоны."""
+        parents = self._parents.get(person.id)
+        if parents is not None:
+            return parents
+        return self._lookup_parents(person)
+
+    def _lookup_parents(self, person: Person) -> tuple:
+        """Родители персоны через её семью (FAMC)."""
         if not person.famc:
             return None, None
         family = self.families.get(person.famc)
@@ -3,9 +3,12 @@
 """
 
 import re
+import sys
+from dataclasses import dataclass, field
 from datetime import date
-from typing import Optional, Tuple, Dict
-from .models import Person, Family, GedcomData
+from functools import lru_cache
+from typing import Optional, Tuple, Dict, List
+from .models import Person, Family, GedcomData, Association
 
 
 MONTHS = {
@@ -13,6 +16,16 @@ MONTHS = {
     'JUL': 7, 'AUG': 8, 'SEP': 9, 'OCT': 10, 'NOV': 11, 'DEC': 12
 }
 
+# Шаблоны компилируются один раз при импорте, а не на каждой строке файла
+_LINE_RE = re.compile(r'^(\d+)\s+(@[^@]+@)?\s*(\w+)?\s*(.*)?$')
+_DATE_FULL = re.compile(r'(\d{1,2})\s+([A-Z]{3})\s+(\d{4})')
+_DATE_MY = re.compile(r'([A-Z]{3})\s+(\d{4})')
+_DATE_Y = re.compile(r'(\d{4})')
+# Модификаторы дат убираются одним проходом
+_MODIFIERS = re.compile(r'\b(?:ABT|BEF|AFT|EST|CAL|FROM|TO|BET|AND)\b')
+# Окончания отчеств (-вич/-ович/-евич входят в -ич, -овна/-евна — в -вна)
+_PATR_SUFFIXES = ('ич', 'вна', 'ична')
+
 
 def parse_date(date_str: str) -> Tuple[Optional[date], Optional[int], bool]:
     """
@@ -21,17 +34,39 @@ def parse_date(date_str: str) -> Tuple[Optional[date], Optional[int], bool]:
     """
     if not date_str:
         return None, None, False
+    return _parse_stripped_date(date_str.strip())
+
+
+# Одни и те же даты ("15 MAY 1893") повторяются у многих записей
+@lru_cache(maxsize=65536)
+def _parse_stripped_date(date_str: str) -> Tuple[Optional[date], Optional[int], bool]:
+    """parse_date для строки без внешних пробелов (результат кэшируется)."""
+    # Частые формы без модификаторов ("15 MAY 1893", "MAY 1893", "1893")
+    # разбираются без регулярных выражений; остальное — ниже, как раньше
+    parts = date_str.split(' ')
+    year_str = parts[-1]
+    if len(parts) <= 3 and len(year_str) == 4 and year_str.isascii() and year_str.isdigit():
+        if len(parts) == 1:
+            return None, int(year_str), False
+        month = MONTHS.get(parts[-2])
+        if month is not None:
+            if len(parts) == 2:
+                return None, int(year_str), False
+            day_str = parts[0]
+            if len(day_str) <= 2 and day_str.isascii() and day_str.isdigit():
+                try:
+                    return date(int(year_str), month, int(day_str)), int(year_str), False
+                except ValueError:
+                    pass
 
-    date_str = date_str.strip()
     is_julian = "@#DJULIAN@" in date_str
-    clean_str = date_str.replace("@#DJULIAN@", "").strip()
+    clean_str = date_str.replace("@#DJULIAN@", "").strip() if is_julian else date_str
 
     # Убираем модификаторы
-    for prefix in ["ABT", "BEF", "AFT", "EST", "CAL", "FROM", "TO", "BET", "AND"]:
-        clean_str = re.sub(rf'\b{prefix}\b', '', clean_str).strip()
+    clean_str = _MODIFIERS.sub('', clean_str).strip()
 
     # Полная дата: "15 MAY 1893"
-    match = re.match(r'(\d{1,2})\s+([A-Z]{3})\s+(\d{4})', clean_str)
+    match = _DATE_FULL.match(clean_str)
     if match:
         day, month_str, year = match.groups()
         if month_str in MONTHS:
@@ -41,290 +76,419 @@ def parse_date(date_str: str) -> Tuple[Optional[date], Optional[int], bool]:
                 pass
 
     # Месяц и год: "MAY 1893"
-    match = re.match(r'([A-Z]{3})\s+(\d{4})', clean_str)
+    match = _DATE_MY.match(clean_str)
     if match:
         month_str, year = match.groups()
         if month_str in MONTHS:
             return None, int(year), is_julian
 
     # Только год: "1893"
-    match = re.search(r'(\d{4})', clean_str)
+    match = _DATE_Y.search(clean_str)
     if match:
         return None, int(match.group(1)), is_julian
 
     return None, None, is_julian
 
 
+def _strip_surname(full_name: str) -> str:
+    """Удаление всех фамилий в слэшах: "Иван /Иванов/" -> "Иван"."""
+    start = full_name.find('/')
+    while start != -1:
+        end = full_name.find('/', start + 1)
+        if end == -1:
+            break
+        full_name = full_name[:start] + full_name[end + 1:]
+        start = full_name.find('/', start)
+    return full_name
+
+
+@lru_cache(maxsize=65536)
 def extract_patronymic(full_name: str) -> str:
     """
     Извлечение отчества из полного имени.
     Например: "Константин Александрович" -> "Александрович"
     """
     # Удаляем фамилию (в слэшах) если есть
-    name = re.sub(r'/[^/]*/', '', full_name).strip()
-    parts = name.split()
+    parts = _strip_surname(full_name).split()
 
     if len(parts) >= 2:
         # Отчество обычно второе слово, заканчивается на -вич/-вна/-ич/-ична
         for part in parts[1:]:
-            if re.search(r'(вич|вна|ич|ична|евич|евна|ович|овна)$', part, re.IGNORECASE):
+            if part.casefold().endswith(_PATR_SUFFIXES):
                 return part
     return ""
 
 
+@lru_cache(maxsize=65536)
 def extract_given_name(full_name: str) -> str:
     """
     Извлечение имени (без фамилии и отчества).
     """
     # Удаляем фамилию (в слэшах)
-    name = re.sub(r'/[^/]*/', '', full_name).strip()
-    parts = name.split()
+    parts = _strip_surname(full_name).split(None, 1)
     return parts[0] if parts else ""
 
 
+@dataclass(slots=True)
+class _Record:
+    """Данные записи INDI/FAM, накопленные до следующей строки уровня 0."""
+    # INDI
+    name: str = ""
+    givn: str = ""
+    surn: str = ""
+    patronymic: str = ""
+    sex: str = ""
+    birth_date: Optional[date] = None
+    birth_year: Optional[int] = None
+    birth_place: str = ""
+    birth_is_julian: bool = False
+    death_date: Optional[date] = None
+    death_year: Optional[int] = None
+    death_place: str = ""
+    death_cause: str = ""
+    death_is_julian: bool = False
+    chr_date: Optional[date] = None
+    chr_is_julian: bool = False
+    famc: Optional[str] = None
+    fams: List[str] = field(default_factory=list)
+    occu: str = ""
+    residence: List[Dict] = field(default_factory=list)
+    current_resi: Optional[Dict] = None
+    godparents: List[str] = field(default_factory=list)
+    associations: List[Association] = field(default_factory=list)
+    notes: List[str] = field(default_factory=list)
+
+    # FAM
+    husb: Optional[str] = None
+    wife: Optional[str] = None
+    children: List[str] = field(default_factory=list)
+    marr_date: Optional[date] = None
+    marr_year: Optional[int] = None
+    marr_place: str = ""
+    marr_is_julian: bool = False
+    div_date: Optional[date] = None
+
+
+def _flush_indi(current_id: str, record: _Record, data: GedcomData):
+    """Сохраняет накопленную запись INDI в data.persons."""
+    data.persons[current_id] = Person(
+        id=current_id,
+        name=record.name,
+        given_name=record.givn or extract_given_name(record.name),
+        surname=record.surn,
+        patronymic=record.patronymic or extract_patronymic(record.name),
+        sex=record.sex,
+        birth_date=record.birth_date,
+        birth_year=record.birth_year,
+        birth_place=record.birth_place,
+        birth_is_julian=record.birth_is_julian,
+        death_date=record.death_date,
+        death_year=record.death_year,
+        death_place=record.death_place,
+        death_cause=record.death_cause,
+        death_is_julian=record.death_is_julian,
+        christening_date=record.chr_date,
+        christening_is_julian=record.chr_is_julian,
+        famc=record.famc,
+        fams=record.fams,
+        occupation=record.occu,
+        residence=record.residence,
+        godparents=record.godparents,
+        associations=record.associations,
+        notes=record.notes
+    )
+
+
+def _flush_fam(current_id: str, record: _Record, data: GedcomData):
+    """Сохраняет накопленную запись FAM в data.families."""
+    data.families[current_id] = Family(
+        id=current_id,
+        husband_id=record.husb,
+        wife_id=record.wife,
+        children_ids=record.children,
+        marriage_date=record.marr_date,
+        marriage_year=record.marr_year,
+        marriage_place=record.marr_place,
+        marriage_is_julian=record.marr_is_julian,
+        divorce_date=record.div_date
+    )
+
+
+# Контекст вложенных строк: тег уровня 1, внутри которого они находятся
+CTX_NONE, CTX_BIRT, CTX_DEAT, CTX_CHR, CTX_RESI, CTX_ASSO, CTX_MARR = range(7)
+
+_CONTEXTS = {
+    "BIRT": CTX_BIRT,
+    "DEAT": CTX_DEAT,
+    "CHR": CTX_CHR,
+    "RESI": CTX_RESI,
+    "ASSO": CTX_ASSO,
+    "MARR": CTX_MARR,
+}
+
+
+# Обработчики тегов: handler(record, value, context), где value — значение
+# без внешних пробелов, context — один из CTX_*.
+# Поля с небольшим числом различных значений (пол, фамилия, места, занятия,
+# причины смерти) интернируются: одинаковые строки хранятся в одном экземпляре.
+
+def _set_name(record: _Record, value: str, context: int):
+    record.name = value.replace('/', '').strip()
+
+
+def _set_sex(record: _Record, value: str, context: int):
+    record.sex = sys.intern(value)
+
+
+def _start_resi(record: _Record, value: str, context: int):
+    record.current_resi = {}
+
+
+def _set_famc(record: _Record, value: str, context: int):
+    record.famc = value
+
+
+def _add_fams(record: _Record, value: str, context: int):
+    record.fams.append(value)
+
+
+def _set_occu(record: _Record, value: str, context: int):
+    record.occu = sys.intern(value)
+
+
+def _add_note(record: _Record, value: str, context: int):
+    record.notes.append(value)
+
+
+def _add_asso(record: _Record, value: str, context: int):
+    record.associations.append(Association(person_id=value or None))
+
+
+def _set_givn(record: _Record, value: str, context: int):
+    # Берём только первое имя
+    record.givn = value.split(maxsplit=1)[0] if value else ""
+
+
+def _set_surn(record: _Record, value: str, context: int):
+    record.surn = sys.intern(value)
+
+
+def _set_indi_date(record: _Record, value: str, context: int):
+    parsed_date, year, is_julian = parse_date(value)
+    if context == CTX_BIRT:
+        record.birth_date = parsed_date
+        record.birth_year = year
+        record.birth_is_julian = is_julian
+    elif context == CTX_DEAT:
+        record.death_date = parsed_date
+        record.death_year = year
+        record.death_is_julian = is_julian
+    elif context == CTX_CHR:
+        record.chr_date = parsed_date
+        record.chr_is_julian = is_julian
+    elif context == CTX_RESI:
+        record.current_resi['date'] = value
+
+
+def _set_indi_plac(record: _Record, value: str, context: int):
+    place = sys.intern(value)
+    if context == CTX_BIRT:
+        record.birth_place = place
+    elif context == CTX_DEAT:
+        record.death_place = place
+    elif context == CTX_RESI:
+        record.current_resi['place'] = place
+
+
+def _set_caus(record: _Record, value: str, context: int):
+    if context == CTX_DEAT:
+        record.death_cause = sys.intern(value)
+
+
+def _set_rela(record: _Record, value: str, context: int):
+    if context != CTX_ASSO:
+        return
+    # Нормализуем один раз при разборе, анализаторам не нужен .lower()
+    relation = sys.intern(value.lower())
+    association = record.associations[-1]
+    association.relation = relation
+    if "godp" in relation or "крёстн" in relation or "кресн" in relation:
+        if association.person_id:
+            record.godparents.append(association.person_id)
+
+
+def _set_lati(record: _Record, value: str, context: int):
+    if context == CTX_RESI and record.current_resi is not None:
+        record.current_resi['lat'] = value
+
+
+def _set_long(record: _Record, value: str, context: int):
+    if context == CTX_RESI and record.current_resi is not None:
+        record.current_resi['lon'] = value
+
+
+def _set_husb(record: _Record, value: str, context: int):
+    record.husb = value
+
+
+def _set_wife(record: _Record, value: str, context: int):
+    record.wife = value
+
+
+def _add_chil(record: _Record, value: str, context: int):
+    record.children.append(value)
+
+
+def _set_marr_date(record: _Record, value: str, context: int):
+    if context == CTX_MARR:
+        record.marr_date, record.marr_year, record.marr_is_julian = parse_date(value)
+
+
+def _set_marr_plac(record: _Record, value: str, context: int):
+    if context == CTX_MARR:
+        record.marr_place = sys.intern(value)
+
+
+# Обработчики по уровням (индекс — уровень строки): {тег: обработчик}.
+# Теги-контексты без данных (BIRT, DEAT, CHR, MARR) обработчиков не имеют:
+# для них на уровне 1 запоминается только контекст (_CONTEXTS).
+# Уровень 3 (MAP) пропускаем, LATI/LONG разбираются на уровне 4.
+_INDI_HANDLERS = (
+    {},
+    {
+        "NAME": _set_name,
+        "SEX": _set_sex,
+        "RESI": _start_resi,
+        "FAMC": _set_famc,
+        "FAMS": _add_fams,
+        "OCCU": _set_occu,
+        "NOTE": _add_note,
+        "ASSO": _add_asso,
+    },
+    {
+        "GIVN": _set_givn,
+        "SURN": _set_surn,
+        "DATE": _set_indi_date,
+        "PLAC": _set_indi_plac,
+        "CAUS": _set_caus,
+        "RELA": _set_rela,
+    },
+    {},
+    {
+        "LATI": _set_lati,
+        "LONG": _set_long,
+    },
+)
+
+# TODO: обработать развод (DIV)
+_FAM_HANDLERS = (
+    {},
+    {
+        "HUSB": _set_husb,
+        "WIFE": _set_wife,
+        "CHIL": _add_chil,
+    },
+    {
+        "DATE": _set_marr_date,
+        "PLAC": _set_marr_plac,
+    },
+)
+
+
 def parse_gedcom(filepath: str) -> GedcomData:
     """
     Парсинг GEDCOM файла.
     Возвращает объект GedcomData со всеми персонами и семьями.
     """
-    with open(filepath, 'r', encoding='utf-8') as f:
-        lines = f.readlines()
-
     data = GedcomData()
 
     current_type = None
     current_id = None
-    current_data: Dict = {}
-
-    # Контекст для вложенных тегов
-    in_birt = False
-    in_deat = False
-    in_marr = False
-    in_chr = False
-    in_resi = False
-    in_asso = False
-    asso_id = None
-
-    for line in lines:
-        line = line.rstrip('\n\r')
-        if not line.strip():
-            continue
-
-        # Парсим уровень, xref, тег и значение
-        match = re.match(r'^(\d+)\s+(@[^@]+@)?\s*(\w+)?\s*(.*)?$', line)
-        if not match:
-            continue
-
-        level = int(match.group(1))
-        xref = match.group(2)
-        tag = match.group(3) or ""
-        value = match.group(4) or ""
-
-        # Уровень 0 - новая запись
-        if level == 0:
-            # Сохраняем предыдущую запись
-            if current_type == "INDI" and current_id:
-                person = Person(
-                    id=current_id,
-                    name=current_data.get('name', ''),
-                    given_name=current_data.get('givn', '') or extract_given_name(current_data.get('name', '')),
-                    surname=current_data.get('surn', ''),
-                    patronymic=current_data.get('patronymic', '') or extract_patronymic(current_data.get('name', '')),
-                    sex=current_data.get('sex', ''),
-                    birth_date=current_data.get('birth_date'),
-                    birth_year=current_data.get('birth_year'),
-                    birth_place=current_data.get('birth_place', ''),
-                    birth_is_julian=current_data.get('birth_is_julian', False),
-                    death_date=current_data.get('death_date'),
-                    death_year=current_data.get('death_year'),
-                    death_place=current_data.get('death_place', ''),
-                    death_cause=current_data.get('death_cause', ''),
-                    death_is_julian=current_data.get('death_is_julian', False),
-                    christening_date=current_data.get('chr_date'),
-                    christening_is_julian=current_data.get('chr_is_julian', False),
-                    famc=current_data.get('famc'),
-                    fams=current_data.get('fams', []),
-                    occupation=current_data.get('occu', ''),
-                    residence=current_data.get('residence', []),
-                    godparents=current_data.get('godparents', []),
-                    notes=current_data.get('notes', [])
-                )
-                data.persons[current_id] = person
-
-            elif current_type == "FAM" and current_id:
-                family = Family(
-                    id=current_id,
-                    husband_id=current_data.get('husb'),
-                    wife_id=current_data.get('wife'),
-                    children_ids=current_data.get('children', []),
-                    marriage_date=current_data.get('marr_date'),
-                    marriage_year=current_data.get('marr_year'),
-                    marriage_place=current_data.get('marr_place', ''),
-                    marriage_is_julian=current_data.get('marr_is_julian', False),
-                    divorce_date=current_data.get('div_date')
-                )
-                data.families[current_id] = family
-
-            # Сбрасываем для новой записи
-            current_data = {'fams': [], 'children': [], 'residence': [], 'godparents': [], 'notes': []}
-            in_birt = in_deat = in_marr = in_chr = in_resi = in_asso = False
-
-            if tag == "INDI":
-                current_type = "INDI"
-                current_id = xref
-            elif tag == "FAM":
-                current_type = "FAM"
-                current_id = xref
+    record = _Record()
+
+    # Обработчики тегов для типа текущей записи (_INDI_HANDLERS/_FAM_HANDLERS)
+    handlers = ()
+    # Контекст вложенных строк (CTX_*), задаётся строкой уровня 1
+    context = CTX_NONE
+
+    # Файл читается построчно, без загрузки всех строк в память
+    with open(filepath, 'r', encoding='utf-8', buffering=1 << 20) as f:
+        for line in f:
+            line = line.rstrip('\n\r')
+            if not line.strip():
+                continue
+
+            # Парсим уровень, xref, тег и значение: "уровень [xref] тег [значение]".
+            # Обычные строки разбираются через str.split, нестандартные
+            # (лишние пробелы, табуляция и т.п.) — регулярным выражением
+            parts = line.split(' ', 2)
+            tag = ""
+            if len(parts) > 1 and parts[0].isdecimal():
+                xref = None
+                tag = parts[1]
+                value = parts[2] if len(parts) == 3 else ""
+                if tag.startswith('@'):
+                    if value and len(tag) > 2 and tag.endswith('@') and '@' not in tag[1:-1]:
+                        xref = tag
+                        tag, _, value = value.partition(' ')
+                    else:
+                        tag = ""
+
+            # \w+ в _LINE_RE: буквы, цифры и подчёркивание (_UID и т.п.)
+            if tag.lstrip('_').isalnum():
+                level = int(parts[0])
+                value = value.lstrip()
             else:
-                current_type = None
-                current_id = None
-            continue
-
-        if not current_id:
-            continue
-
-        # Уровень 1 - основные теги
-        if level == 1:
-            in_birt = in_deat = in_marr = in_chr = in_resi = in_asso = False
-
-            if current_type == "INDI":
-                if tag == "NAME":
-                    current_data['name'] = value.replace('/', '').strip()
-                elif tag == "SEX":
-                    current_data['sex'] = value.strip()
-                elif tag == "BIRT":
-                    in_birt = True
-                elif tag == "DEAT":
-                    in_deat = True
-                elif tag == "CHR":
-                    in_chr = True
-                elif tag == "RESI":
-                    in_resi = True
-                    current_data['current_resi'] = {}
-                elif tag == "FAMC":
-                    current_data['famc'] = value.strip()
-                elif tag == "FAMS":
-                    current_data['fams'].append(value.strip())
-                elif tag == "OCCU":
-                    current_data['occu'] = value.strip()
-                elif tag == "NOTE":
-                    current_data['notes'].append(value.strip())
-                elif tag == "ASSO":
-                    in_asso = True
-                    asso_id = value.strip()
-
-            elif current_type == "FAM":
-                if tag == "HUSB":
-                    current_data['husb'] = value.strip()
-                elif tag == "WIFE":
-                    current_data['wife'] = value.strip()
-                elif tag == "CHIL":
-                    current_data['children'].append(value.strip())
-                elif tag == "MARR":
-                    in_marr = True
-                elif tag == "DIV":
-                    pass  # TODO: обработать развод
-
-        # Уровень 2 - вложенные данные
-        elif level == 2:
-            if current_type == "INDI":
-                if tag == "GIVN":
-                    # Берём только первое имя
-                    given = value.strip().split()[0] if value.strip() else ""
-                    current_data['givn'] = given
-                elif tag == "SURN":
-                    current_data['surn'] = value.strip()
-                elif tag == "DATE":
-                    parsed_date, year, is_julian = parse_date(value)
-                    if in_birt:
-                        current_data['birth_date'] = parsed_date
-                        current_data['birth_year'] = year
-                        current_data['birth_is_julian'] = is_julian
-                    elif in_deat:
-                        current_data['death_date'] = parsed_date
-                        current_data['death_year'] = year
-                        current_data['death_is_julian'] = is_julian
-                    elif in_chr:
-                        current_data['chr_date'] = parsed_date
-                        current_data['chr_is_julian'] = is_julian
-                    elif in_resi:
-                        current_data['current_resi']['date'] = value.strip()
-                elif tag == "PLAC":
-                    if in_birt:
-                        current_data['birth_place'] = value.strip()
-                    elif in_deat:
-                        current_data['death_place'] = value.strip()
-                    elif in_resi:
-                        current_data['current_resi']['place'] = value.strip()
-                elif tag == "CAUS" and in_deat:
-                    current_data['death_cause'] = value.strip()
-                elif tag == "RELA" and in_asso:
-                    if "godp" in value.lower() or "крёстн" in value.lower() or "кресн" in value.lower():
-                        if asso_id:
-                            current_data['godparents'].append(asso_id)
-
-            elif current_type == "FAM":
-                if tag == "DATE" and in_marr:
-                    parsed_date, year, is_julian = parse_date(value)
-                    current_data['marr_date'] = parsed_date
-                    current_data['marr_year'] = year
-                    current_data['marr_is_julian'] = is_julian
-                elif tag == "PLAC" and in_marr:
-                    current_data['marr_place'] = value.strip()
-
-        # Уровень 3+ - координаты и т.д.
-        elif level == 3:
-            if tag == "MAP" or in_resi:
-                pass  # Пропускаем MAP, обрабатываем LATI/LONG на уровне 4
-
-        elif level == 4:
-            if in_resi and current_data.get('current_resi') is not None:
-                if tag == "LATI":
-                    current_data['current_resi']['lat'] = value.strip()
-                elif tag == "LONG":
-                    current_data['current_resi']['lon'] = value.strip()
+                match = _LINE_RE.match(line)
+                if not match:
+                    continue
+
+                level = int(match.group(1))
+                xref = match.group(2)
+                tag = match.group(3) or ""
+                value = match.group(4) or ""
+
+            # Уровень 0 - новая запись
+            if level == 0:
+                # Сохраняем предыдущую запись
+                if current_type == "INDI" and current_id:
+                    _flush_indi(current_id, record, data)
+                elif current_type == "FAM" and current_id:
+                    _flush_fam(current_id, record, data)
+
+                # Сбрасываем для новой записи
+                record = _Record()
+                context = CTX_NONE
+
+                if tag == "INDI":
+                    current_type = "INDI"
+                    current_id = xref
+                    handlers = _INDI_HANDLERS
+                elif tag == "FAM":
+                    current_type = "FAM"
+                    current_id = xref
+                    handlers = _FAM_HANDLERS
+                else:
+                    current_type = None
+                    current_id = None
+                continue
+
+            if not current_id:
+                continue
+
+            # Уровень 1 задаёт контекст для вложенных строк (BIRT, DEAT, RESI, ...)
+            if level == 1:
+                context = _CONTEXTS.get(tag, CTX_NONE)
+            if level < len(handlers):
+                handler = handlers[level].get(tag)
+                if handler is not None:
+                    handler(record, value.strip(), context)
 
     # Сохраняем последнюю запись
     if current_type == "INDI" and current_id:
-        person = Person(
-            id=current_id,
-            name=current_data.get('name', ''),
-            given_name=current_data.get('givn', '') or extract_given_name(current_data.get('name', '')),
-            surname=current_data.get('surn', ''),
-            patronymic=current_data.get('patronymic', '') or extract_patronymic(current_data.get('name', '')),
-            sex=current_data.get('sex', ''),
-            birth_date=current_data.get('birth_date'),
-            birth_year=current_data.get('birth_year'),
-            birth_place=current_data.get('birth_place', ''),
-            birth_is_julian=current_data.get('birth_is_julian', False),
-            death_date=current_data.get('death_date'),
-            death_year=current_data.get('death_year'),
-            death_place=current_data.get('death_place', ''),
-            death_cause=current_data.get('death_cause', ''),
-            death_is_julian=current_data.get('death_is_julian', False),
-            christening_date=current_data.get('chr_date'),
-            christening_is_julian=current_data.get('chr_is_julian', False),
-            famc=current_data.get('famc'),
-            fams=current_data.get('fams', []),
-            occupation=current_data.get('occu', ''),
-            residence=current_data.get('residence', []),
-            godparents=current_data.get('godparents', []),
-            notes=current_data.get('notes', [])
-        )
-        data.persons[current_id] = person
-
+        _flush_indi(current_id, record, data)
     elif current_type == "FAM" and current_id:
-        family = Family(
-            id=current_id,
-            husband_id=current_data.get('husb'),
-            wife_id=current_data.get('wife'),
-            children_ids=current_data.get('children', []),
-            marriage_date=current_data.get('marr_date'),
-            marriage_year=current_data.get('marr_year'),
-            marriage_place=current_data.get('marr_place', ''),
-            marriage_is_julian=current_data.get('marr_is_julian', False),
-            divorce_date=current_data.get('div_date')
-        )
-        data.families[current_id] = family
+        _flush_fam(current_id, record, data)
 
+    data.build_indexes()
     return data
@@ -0,0 +1,35 @@
+"""
+Сводная статистика по целочисленным выборкам (возрасты, интервалы в годах).
+"""
+
+import math
+import statistics
+from typing import List, Tuple
+
+
+def mean(values: List[int]) -> float:
+    """Среднее целых чисел (как statistics.mean, без дробей)."""
+    return sum(values) / len(values)
+
+
+def median_sorted(values: List[int]):
+    """Медиана уже отсортированного списка (как statistics.median)."""
+    mid = len(values) // 2
+    if len(values) % 2:
+        return values[mid]
+    return (values[mid - 1] + values[mid]) / 2
+
+
+def stdev(values: List[int]) -> float:
+    """Выборочное стандартное отклонение по точным целочисленным суммам."""
+    n = len(values)
+    if n < 2:
+        raise statistics.StatisticsError('stdev requires at least two data points')
+    total = sum(values)
+    squares = sum(v * v for v in values)
+    return math.sqrt((n * squares - total * total) / (n * (n - 1)))
+
+
+def summarize_sorted(values: List[int]) -> Tuple[float, float, int, int]:
+    """Среднее, медиана, минимум и максимум уже отсортированного списка."""
+    return mean(values), median_sorted(values), values[0], values[-1]
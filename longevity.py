@@ -11,13 +11,13 @@
 
 import sys
 import argparse
+from bisect import bisect_left
 from dataclasses import dataclass
 from typing import Optional, List, Dict, Tuple
-from collections import defaultdict
-import statistics
+from collections import defaultdict, Counter
 
 sys.path.insert(0, '.')
-from lib import parse_gedcom, Person, Family, GedcomData
+from lib import parse_gedcom, Person, Family, GedcomData, mean, median_sorted, stdev
 
 
 @dataclass
@@ -32,8 +32,8 @@ class LifespanData:
     cause_of_death: Optional[str]
 
 
-def calculate_age(person: Person) -> Optional[int]:
-    """Вычисление возраста на момент смерти."""
+def calculate_age(person: Person) -> Optional[Tuple[int, int, int]]:
+    """Вычисление возраста на момент смерти: (год рождения, год смерти, возраст)."""
     birth_year = None
     death_year = None
 
@@ -50,7 +50,7 @@ def calculate_age(person: Person) -> Optional[int]:
     if birth_year and death_year:
         age = death_year - birth_year
         if 0 <= age <= 120:  # Реалистичный возраст
-            return age
+            return birth_year, death_year, age
 
     return None
 
@@ -69,16 +69,11 @@ def collect_lifespan_data(data: GedcomData, before_year: Optional[int] = None,
     """Сбор данных о продолжительности жизни."""
     results = []
 
-    for person_id, person in data.persons.items():
-        age = calculate_age(person)
-        if age is None:
-            continue
-
-        birth_year = person.birth_date.year if person.birth_date else person.birth_year
-        death_year = person.death_date.year if person.death_date else person.death_year
-
-        if not birth_year or not death_year:
+    for person in data.persons.values():
+        res = calculate_age(person)
+        if res is None:
             continue
+        birth_year, death_year, age = res
 
         # Фильтры
         if before_year and birth_year > before_year:
@@ -107,20 +102,23 @@ def analyze_by_period(lifespans: List[LifespanData], period: int = 50) -> Dict:
 
     for ls in lifespans:
         period_start = (ls.birth_year // period) * period
-        by_period[period_start].append(ls)
+        by_period[period_start].append(ls.age)
 
     stats = {}
-    for p, data in sorted(by_period.items()):
-        ages = [ls.age for ls in data]
-        ages_adult = [a for a in ages if a >= 5]
+    for p, ages in sorted(by_period.items()):
+        # Возрасты группы сортируются один раз: максимум — последний элемент,
+        # умершие до 5 лет — префикс до bisect_left(ages, 5)
+        ages.sort()
+        infant_count = bisect_left(ages, 5)
+        ages_adult = ages[infant_count:]
 
         stats[p] = {
-            'count': len(data),
-            'mean_all': statistics.mean(ages) if ages else 0,
-            'mean_adult': statistics.mean(ages_adult) if ages_adult else 0,
-            'median': statistics.median(ages) if ages else 0,
-            'max': max(ages) if ages else 0,
-            'infant_mortality': len([a for a in ages if a < 5]) / len(ages) * 100 if ages else 0,
+            'count': len(ages),
+            'mean_all': mean(ages) if ages else 0,
+            'mean_adult': mean(ages_adult) if ages_adult else 0,
+            'median': median_sorted(ages) if ages else 0,
+            'max': ages[-1] if ages else 0,
+            'infant_mortality': infant_count / len(ages) * 100 if ages else 0,
             'ages': ages
         }
 
@@ -140,16 +138,17 @@ def analyze_by_sex(lifespans: List[LifespanData]) -> Dict:
     for sex, ages in by_sex.items():
         if not ages:
             continue
-        ages_adult = [a for a in ages if a >= 5]
+        ages.sort()
+        ages_adult = ages[bisect_left(ages, 5):]
 
         stats[sex_names[sex]] = {
             'count': len(ages),
-            'mean': statistics.mean(ages),
-            'mean_adult': statistics.mean(ages_adult) if ages_adult else 0,
-            'median': statistics.median(ages),
-            'stdev': statistics.stdev(ages) if len(ages) > 1 else 0,
-            'max': max(ages),
-            'min': min(ages),
+            'mean': mean(ages),
+            'mean_adult': mean(ages_adult) if ages_adult else 0,
+            'median': median_sorted(ages),
+            'stdev': stdev(ages) if len(ages) > 1 else 0,
+            'max': ages[-1],
+            'min': ages[0],
         }
 
     return stats
@@ -158,21 +157,25 @@ def analyze_by_sex(lifespans: List[LifespanData]) -> Dict:
 def analyze_by_place(lifespans: List[LifespanData], top_n: int = 15) -> Dict:
     """Анализ по местам."""
     by_place = defaultdict(list)
+    main_parts = {}  # полное место -> первая часть (места повторяются)
 
     for ls in lifespans:
         if ls.place:
             # Берём первую часть места
-            place = ls.place.split(',')[0].strip()
+            place = main_parts.get(ls.place)
+            if place is None:
+                place = main_parts[ls.place] = ls.place.split(',')[0].strip()
             by_place[place].append(ls.age)
 
     stats = {}
     for place, ages in by_place.items():
         if len(ages) >= 3:  # Минимум 3 человека
+            ages.sort()
             stats[place] = {
                 'count': len(ages),
-                'mean': statistics.mean(ages),
-                'median': statistics.median(ages),
-                'max': max(ages),
+                'mean': mean(ages),
+                'median': median_sorted(ages),
+                'max': ages[-1],
             }
 
     # Сортируем по количеству
@@ -193,11 +196,13 @@ def analyze_infant_mortality(data: GedcomData, before_year: Optional[int] = None
         'deaths_0': 0,      # до года
         'deaths_1_5': 0,    # 1-5 лет
         'deaths_5_15': 0,   # 5-15 лет
-        'by_decade': defaultdict(lambda: {'births': 0, 'infant_deaths': 0}),
     }
+    births_by_decade = Counter()
+    infant_deaths_by_decade = Counter()
 
-    for person_id, person in data.persons.items():
-        birth_year = person.birth_date.year if person.birth_date else person.birth_year
+    # Нужны только годы — идём по массивам, не трогая объекты Person
+    years = data.life_years()
+    for birth_year, death_year in zip(years.birth_years, years.death_years):
         if not birth_year:
             continue
 
@@ -206,19 +211,23 @@ def analyze_infant_mortality(data: GedcomData, before_year: Optional[int] = None
 
         stats['total_births'] += 1
         decade = (birth_year // 10) * 10
-        stats['by_decade'][decade]['births'] += 1
+        births_by_decade[decade] += 1
 
-        age = calculate_age(person)
-        if age is not None:
+        age = death_year - birth_year
+        if death_year and 0 <= age <= 120:  # как в calculate_age
             if age < 1:
                 stats['deaths_0'] += 1
-                stats['by_decade'][decade]['infant_deaths'] += 1
+                infant_deaths_by_decade[decade] += 1
             elif age < 5:
                 stats['deaths_1_5'] += 1
-                stats['by_decade'][decade]['infant_deaths'] += 1
+                infant_deaths_by_decade[decade] += 1
             elif age < 15:
                 stats['deaths_5_15'] += 1
 
+    stats['by_decade'] = {
+        decade: {'births': births, 'infant_deaths': infant_deaths_by_decade[decade]}
+        for decade, births in births_by_decade.items()
+    }
     return stats
 
 
@@ -268,22 +277,22 @@ def main():
         print("\n".join(output_lines))
         return
 
-    all_ages = [ls.age for ls in lifespans]
+    all_ages = sorted(ls.age for ls in lifespans)
 
     # Общая статистика
     output_lines.append(f"\n📊 ОБЩАЯ СТАТИСТИКА:")
     output_lines.append(f"   Персон с датами рождения и смерти: {len(lifespans)}")
-    output_lines.append(f"   Средний возраст: {statistics.mean(all_ages):.1f} лет")
-    output_lines.append(f"   Медианный возраст: {statistics.median(all_ages):.1f} лет")
-    output_lines.append(f"   Стандартное отклонение: {statistics.stdev(all_ages):.1f} лет")
-    output_lines.append(f"   Максимальный возраст: {max(all_ages)} лет")
+    output_lines.append(f"   Средний возраст: {mean(all_ages):.1f} лет")
+    output_lines.append(f"   Медианный возраст: {median_sorted(all_ages):.1f} лет")
+    output_lines.append(f"   Стандартное отклонение: {stdev(all_ages):.1f} лет")
+    output_lines.append(f"   Максимальный возраст: {all_ages[-1]} лет")
 
     # Взрослые (5+)
-    adult_ages = [a for a in all_ages if a >= 5]
+    adult_ages = all_ages[bisect_left(all_ages, 5):]
     if adult_ages:
         output_lines.append(f"\n   Для доживших до 5 лет:")
-        output_lines.append(f"      Средний возраст: {statistics.mean(adult_ages):.1f} лет")
-        output_lines.append(f"      Медианный возраст: {statistics.median(adult_ages):.1f} лет")
+        output_lines.append(f"      Средний возраст: {mean(adult_ages):.1f} лет")
+        output_lines.append(f"      Медианный возраст: {median_sorted(adult_ages):.1f} лет")
 
     # По полу
     sex_stats = analyze_by_sex(lifespans)
@@ -373,10 +382,7 @@ def main():
     output_lines.append("📊 РАСПРЕДЕЛЕНИЕ ВОЗРАСТОВ")
     output_lines.append("=" * 100)
 
-    age_buckets = defaultdict(int)
-    for age in all_ages:
-        bucket = (age // 10) * 10
-        age_buckets[bucket] += 1
+    age_buckets = Counter((age // 10) * 10 for age in all_ages)
 
     max_count = max(age_buckets.values()) if age_buckets else 1
     for bucket in sorted(age_buckets.keys()):
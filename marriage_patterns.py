@@ -8,18 +8,21 @@
     python3 marriage_patterns.py tree.ged --before 1920
 """
 
+import re
 import sys
 import argparse
+import heapq
+from bisect import bisect_left
 from dataclasses import dataclass
 from typing import Optional, List, Dict, Tuple
-from collections import defaultdict
-import statistics
+from collections import defaultdict, Counter
+from functools import lru_cache
 
 sys.path.insert(0, '.')
-from lib import parse_gedcom, Person, Family, GedcomData
+from lib import parse_gedcom, Person, Family, GedcomData, mean, summarize_sorted
 
 
-@dataclass
+@dataclass(slots=True)
 class MarriageData:
     """Данные о браке."""
     family: Family
@@ -34,6 +37,13 @@ class MarriageData:
     wife_place: Optional[str]
 
 
+# Группы разницы в возрасте (муж - жена): группа i — разницы от
+# _DIFF_EDGES[i-1] (включительно) до _DIFF_EDGES[i] (не включительно)
+_DIFF_EDGES = (-5, 0, 1, 6, 11)
+_DIFF_LABELS = ("жена старше на 5+", "жена старше на 1-5", "ровесники",
+                "муж старше на 1-5", "муж старше на 6-10", "муж старше на 10+")
+
+
 def get_birth_year(person: Person) -> Optional[int]:
     """Получить год рождения."""
     if person.birth_date:
@@ -55,22 +65,31 @@ def extract_main_place(place: str) -> str:
     return place.split(',')[0].strip().lower()
 
 
+# Типичные префиксы населённых пунктов. Снимаются по порядку, каждый
+# не больше одного раза ("д.с. X" -> "X"), поэтому в регулярном выражении
+# это цепочка необязательных групп, а не альтернатива
+_PLACE_PREFIXES = ('д.', 'д ', 'с.', 'с ', 'село ', 'деревня ', 'г.', 'г ', 'город ')
+_PREFIX_RE = re.compile('^' + ''.join(f'(?:{re.escape(prefix)})?' for prefix in _PLACE_PREFIXES))
+
+
+@lru_cache(maxsize=65536)
 def normalize_place(place: str) -> str:
-    """Нормализовать место для сравнения."""
+    """
+    Нормализовать место для сравнения.
+    Места повторяются у тысяч персон, поэтому результат кэшируется
+    и интернируется: одинаковые места — один объект строки.
+    """
     if not place:
         return ""
-    p = place.lower().strip()
     # Убираем типичные префиксы
-    for prefix in ['д.', 'д ', 'с.', 'с ', 'село ', 'деревня ', 'г.', 'г ', 'город ']:
-        if p.startswith(prefix):
-            p = p[len(prefix):]
-    return p.strip()
+    p = _PREFIX_RE.sub('', place.lower().strip(), count=1)
+    return sys.intern(p.strip())
 
 
-def analyze_marriage(family: Family, data: GedcomData) -> Optional[MarriageData]:
-    """Анализ одного брака."""
-    husband = data.get_person(family.husband_id) if family.husband_id else None
-    wife = data.get_person(family.wife_id) if family.wife_id else None
+def analyze_marriage(family: Family, persons: Dict[str, Person]) -> Optional[MarriageData]:
+    """Анализ одного брака (persons — словарь data.persons)."""
+    husband = persons.get(family.husband_id) if family.husband_id else None
+    wife = persons.get(family.wife_id) if family.wife_id else None
 
     if not husband or not wife:
         return None
@@ -124,80 +143,106 @@ def analyze_all_marriages(data: GedcomData, before_year: Optional[int] = None) -
     stats = {
         'total': 0,
         'with_ages': 0,
-        'marriages': [],
         'husband_ages': [],
         'wife_ages': [],
         'age_differences': [],
         'same_place_count': 0,
         'different_place_count': 0,
-        'place_pairs': defaultdict(int),
-        'by_decade': defaultdict(lambda: {'count': 0, 'husband_ages': [], 'wife_ages': []}),
+        'place_pairs': Counter(),
+        # По десятилетиям: число браков и возрасты супругов
+        'decade_count': Counter(),
+        'decade_husband_ages': defaultdict(list),
+        'decade_wife_ages': defaultdict(list),
         'unusual_ages': [],
         'large_age_diff': [],
         'wife_older': [],
     }
 
+    # Методы и вложенные словари — в локальные переменные до цикла
+    husband_ages_append = stats['husband_ages'].append
+    wife_ages_append = stats['wife_ages'].append
+    age_differences_append = stats['age_differences'].append
+    large_age_diff_append = stats['large_age_diff'].append
+    wife_older_append = stats['wife_older'].append
+    unusual_append = stats['unusual_ages'].append
+    place_pairs = stats['place_pairs']
+    decade_count = stats['decade_count']
+    decade_husband_ages = stats['decade_husband_ages']
+    decade_wife_ages = stats['decade_wife_ages']
+
+    persons = data.persons
     for family_id, family in data.families.items():
-        marriage_data = analyze_marriage(family, data)
-        if not marriage_data:
+        marriage_year = get_marriage_year(family)
+
+        # Фильтр по году — до разбора супругов и мест
+        if before_year and marriage_year and marriage_year > before_year:
             continue
 
-        # Фильтр по году
-        if before_year and marriage_data.marriage_year and marriage_data.marriage_year > before_year:
+        marriage_data = analyze_marriage(family, persons)
+        if not marriage_data:
             continue
 
+        husband_age = marriage_data.husband_age
+        wife_age = marriage_data.wife_age
+        age_diff = marriage_data.age_difference
+
         stats['total'] += 1
-        stats['marriages'].append(marriage_data)
 
         # Возраст
-        if marriage_data.husband_age:
-            stats['husband_ages'].append(marriage_data.husband_age)
-        if marriage_data.wife_age:
-            stats['wife_ages'].append(marriage_data.wife_age)
+        if husband_age:
+            husband_ages_append(husband_age)
+        if wife_age:
+            wife_ages_append(wife_age)
 
-        if marriage_data.husband_age and marriage_data.wife_age:
+        if husband_age and wife_age:
             stats['with_ages'] += 1
 
         # Разница в возрасте
-        if marriage_data.age_difference is not None:
-            stats['age_differences'].append(marriage_data.age_difference)
+        if age_diff is not None:
+            age_differences_append(age_diff)
 
             # Большая разница (> 15 лет)
-            if abs(marriage_data.age_difference) > 15:
-                stats['large_age_diff'].append(marriage_data)
+            if abs(age_diff) > 15:
+                large_age_diff_append(marriage_data)
 
             # Жена старше мужа
-            if marriage_data.age_difference < -3:
-                stats['wife_older'].append(marriage_data)
+            if age_diff < -3:
+                wife_older_append(marriage_data)
 
         # Эндогамия/экзогамия
-        if marriage_data.husband_place and marriage_data.wife_place:
+        husband_place = marriage_data.husband_place
+        wife_place = marriage_data.wife_place
+        if husband_place and wife_place:
             if marriage_data.same_place:
                 stats['same_place_count'] += 1
             else:
                 stats['different_place_count'] += 1
                 # Записываем пару мест
-                pair = tuple(sorted([marriage_data.husband_place, marriage_data.wife_place]))
-                stats['place_pairs'][pair] += 1
+                if husband_place <= wife_place:
+                    place_pairs[husband_place, wife_place] += 1
+                else:
+                    place_pairs[wife_place, husband_place] += 1
 
         # По десятилетиям
-        if marriage_data.marriage_year:
-            decade = (marriage_data.marriage_year // 10) * 10
-            stats['by_decade'][decade]['count'] += 1
-            if marriage_data.husband_age:
-                stats['by_decade'][decade]['husband_ages'].append(marriage_data.husband_age)
-            if marriage_data.wife_age:
-                stats['by_decade'][decade]['wife_ages'].append(marriage_data.wife_age)
-
-        # Необычный возраст
-        if marriage_data.husband_age and marriage_data.husband_age > 40:
-            stats['unusual_ages'].append(('husband_old', marriage_data))
-        if marriage_data.wife_age and marriage_data.wife_age > 35:
-            stats['unusual_ages'].append(('wife_old', marriage_data))
-        if marriage_data.husband_age and marriage_data.husband_age < 18:
-            stats['unusual_ages'].append(('husband_young', marriage_data))
-        if marriage_data.wife_age and marriage_data.wife_age < 16:
-            stats['unusual_ages'].append(('wife_young', marriage_data))
+        if marriage_year:
+            decade = (marriage_year // 10) * 10
+            decade_count[decade] += 1
+            if husband_age:
+                decade_husband_ages[decade].append(husband_age)
+            if wife_age:
+                decade_wife_ages[decade].append(wife_age)
+
+        # Необычный возраст (старше и моложе порогов сразу быть нельзя)
+        if husband_age:
+            if husband_age > 40:
+                unusual_append(('husband_old', marriage_data))
+            elif husband_age < 18:
+                unusual_append(('husband_young', marriage_data))
+        if wife_age:
+            if wife_age > 35:
+                unusual_append(('wife_old', marriage_data))
+            elif wife_age < 16:
+                unusual_append(('wife_young', marriage_data))
 
     return stats
 
@@ -239,33 +284,38 @@ def main():
         output_lines.append("💍 ВОЗРАСТ ВСТУПЛЕНИЯ В БРАК")
         output_lines.append("=" * 100)
 
-        if stats['husband_ages']:
+        husband_ages = sorted(stats['husband_ages'])
+        if husband_ages:
             output_lines.append(f"\n   Мужчины:")
-            output_lines.append(f"      Средний возраст: {statistics.mean(stats['husband_ages']):.1f} лет")
-            output_lines.append(f"      Медиана: {statistics.median(stats['husband_ages']):.1f} лет")
-            output_lines.append(f"      Диапазон: {min(stats['husband_ages'])}-{max(stats['husband_ages'])} лет")
+            avg, median, lowest, highest = summarize_sorted(husband_ages)
+            output_lines.append(f"      Средний возраст: {avg:.1f} лет")
+            output_lines.append(f"      Медиана: {median:.1f} лет")
+            output_lines.append(f"      Диапазон: {lowest}-{highest} лет")
 
-        if stats['wife_ages']:
+        wife_ages = sorted(stats['wife_ages'])
+        if wife_ages:
             output_lines.append(f"\n   Женщины:")
-            output_lines.append(f"      Средний возраст: {statistics.mean(stats['wife_ages']):.1f} лет")
-            output_lines.append(f"      Медиана: {statistics.median(stats['wife_ages']):.1f} лет")
-            output_lines.append(f"      Диапазон: {min(stats['wife_ages'])}-{max(stats['wife_ages'])} лет")
+            avg, median, lowest, highest = summarize_sorted(wife_ages)
+            output_lines.append(f"      Средний возраст: {avg:.1f} лет")
+            output_lines.append(f"      Медиана: {median:.1f} лет")
+            output_lines.append(f"      Диапазон: {lowest}-{highest} лет")
 
         # Гистограмма возраста женщин
-        if stats['wife_ages']:
+        if wife_ages:
             output_lines.append("\n   Распределение возраста невест:")
-            buckets = defaultdict(int)
-            for age in stats['wife_ages']:
-                bucket = (age // 5) * 5
-                buckets[bucket] += 1
-
-            max_count = max(buckets.values()) if buckets else 1
-            for bucket in sorted(buckets.keys()):
+            # Возрасты отсортированы — пятилетние группы режем бинарным поиском
+            buckets = {}
+            for bucket in range((wife_ages[0] // 5) * 5, wife_ages[-1] + 1, 5):
+                count = bisect_left(wife_ages, bucket + 5) - bisect_left(wife_ages, bucket)
+                if count:
+                    buckets[bucket] = count
+
+            max_count = max(buckets.values())
+            for bucket, count in buckets.items():
                 if bucket < 50:
-                    count = buckets[bucket]
                     bar_len = int(30 * count / max_count)
                     bar = "█" * bar_len
-                    pct = count / len(stats['wife_ages']) * 100
+                    pct = count / len(wife_ages) * 100
                     output_lines.append(f"      {bucket:>2}-{bucket+4:<2}: {bar} {count} ({pct:.1f}%)")
 
     # Разница в возрасте
@@ -274,39 +324,25 @@ def main():
         output_lines.append("📏 РАЗНИЦА В ВОЗРАСТЕ СУПРУГОВ")
         output_lines.append("=" * 100)
 
-        output_lines.append(f"\n   Средняя разница: {statistics.mean(stats['age_differences']):.1f} лет (муж старше)")
-        output_lines.append(f"   Медиана: {statistics.median(stats['age_differences']):.1f} лет")
+        diffs = sorted(stats['age_differences'])
+        avg, median, _, _ = summarize_sorted(diffs)
+        output_lines.append(f"\n   Средняя разница: {avg:.1f} лет (муж старше)")
+        output_lines.append(f"   Медиана: {median:.1f} лет")
 
         # Распределение
         output_lines.append("\n   Распределение:")
-        buckets = defaultdict(int)
-        for diff in stats['age_differences']:
-            if diff < -5:
-                bucket = "жена старше на 5+"
-            elif diff < 0:
-                bucket = "жена старше на 1-5"
-            elif diff == 0:
-                bucket = "ровесники"
-            elif diff <= 5:
-                bucket = "муж старше на 1-5"
-            elif diff <= 10:
-                bucket = "муж старше на 6-10"
-            else:
-                bucket = "муж старше на 10+"
-            buckets[bucket] += 1
-
-        order = ["жена старше на 5+", "жена старше на 1-5", "ровесники",
-                 "муж старше на 1-5", "муж старше на 6-10", "муж старше на 10+"]
-        for bucket in order:
-            if bucket in buckets:
-                count = buckets[bucket]
-                pct = count / len(stats['age_differences']) * 100
+        # Разницы отсортированы — границы групп находим бинарным поиском
+        bounds = [0] + [bisect_left(diffs, edge) for edge in _DIFF_EDGES] + [len(diffs)]
+        for bucket, start, end in zip(_DIFF_LABELS, bounds, bounds[1:]):
+            count = end - start
+            if count:
+                pct = count / len(diffs) * 100
                 output_lines.append(f"      {bucket}: {count} ({pct:.1f}%)")
 
     # Большая разница в возрасте
     if stats['large_age_diff']:
         output_lines.append(f"\n   ⚠️ Большая разница (>15 лет): {len(stats['large_age_diff'])}")
-        for md in sorted(stats['large_age_diff'], key=lambda x: -abs(x.age_difference))[:5]:
+        for md in heapq.nlargest(5, stats['large_age_diff'], key=lambda x: abs(x.age_difference)):
             output_lines.append(f"      {md.husband.name} ({md.husband_age}) + {md.wife.name} ({md.wife_age}): "
                                f"{abs(md.age_difference)} лет")
 
@@ -335,13 +371,12 @@ def main():
         # Популярные межместные браки
         if stats['place_pairs']:
             output_lines.append("\n   Популярные межместные пары:")
-            sorted_pairs = sorted(stats['place_pairs'].items(), key=lambda x: -x[1])
-            for (p1, p2), count in sorted_pairs[:10]:
+            for (p1, p2), count in stats['place_pairs'].most_common(10):
                 if count > 1:
                     output_lines.append(f"      {p1} ↔ {p2}: {count}")
 
     # По десятилетиям
-    if stats['by_decade']:
+    if stats['decade_count']:
         output_lines.append("\n" + "=" * 100)
         output_lines.append("📅 ВОЗРАСТ БРАКА ПО ДЕСЯТИЛЕТИЯМ")
         output_lines.append("=" * 100)
@@ -349,11 +384,12 @@ def main():
         output_lines.append(f"\n   {'Период':<12} {'Браков':<8} {'Муж (ср.)':<12} {'Жена (ср.)':<12}")
         output_lines.append("   " + "-" * 50)
 
-        for decade in sorted(stats['by_decade'].keys()):
-            d = stats['by_decade'][decade]
-            h_avg = f"{statistics.mean(d['husband_ages']):.1f}" if d['husband_ages'] else "?"
-            w_avg = f"{statistics.mean(d['wife_ages']):.1f}" if d['wife_ages'] else "?"
-            output_lines.append(f"   {decade}s       {d['count']:<8} {h_avg:<12} {w_avg:<12}")
+        for decade, count in sorted(stats['decade_count'].items()):
+            husband_ages = stats['decade_husband_ages'].get(decade)
+            wife_ages = stats['decade_wife_ages'].get(decade)
+            h_avg = f"{mean(husband_ages):.1f}" if husband_ages else "?"
+            w_avg = f"{mean(wife_ages):.1f}" if wife_ages else "?"
+            output_lines.append(f"   {decade}s       {count:<8} {h_avg:<12} {w_avg:<12}")
 
     # Интерпретация
     output_lines.append("\n" + "=" * 100)
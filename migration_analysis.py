@@ -12,15 +12,18 @@
 import sys
 import argparse
 import re
+import heapq
 from dataclasses import dataclass, field
 from typing import Optional, List, Dict, Set, Tuple
-from collections import defaultdict
+from collections import defaultdict, deque
+from functools import lru_cache
+from operator import itemgetter
 
 sys.path.insert(0, '.')
 from lib import parse_gedcom, Person, Family, GedcomData
 
 
-@dataclass
+@dataclass(slots=True)
 class LocationEvent:
     """Событие с локацией."""
     person: Person
@@ -30,7 +33,7 @@ class LocationEvent:
     normalized_place: str
 
 
-@dataclass
+@dataclass(slots=True)
 class MigrationEvent:
     """Событие миграции."""
     person: Person
@@ -41,7 +44,7 @@ class MigrationEvent:
     event_type: str  # birth_to_death, birth_to_marriage, residence_change
 
 
-@dataclass
+@dataclass(slots=True)
 class FamilyMigrationPattern:
     """Паттерн миграции семьи."""
     family: Family
@@ -50,6 +53,43 @@ class FamilyMigrationPattern:
     distance_generations: int  # через сколько поколений
 
 
+# Типичные сокращения и уточнения в названиях мест. Применяются по очереди:
+# порядок важен ("город." -> сначала снимается "д."). Первый элемент — литерал,
+# без которого шаблон совпасть не может: по нему пропускаем заведомо пустой sub
+_REMOVE_PATTERNS = tuple((keyword, re.compile(pattern, re.IGNORECASE)) for keyword, pattern in (
+    ('губ', r'\s*губ\.?\s*'),
+    ('уезд', r'\s*уезд\.?\s*'),
+    ('волость', r'\s*волость\.?\s*'),
+    ('обл', r'\s*обл\.?\s*'),
+    ('область', r'\s*область\s*'),
+    ('район', r'\s*район\s*'),
+    ('р-н', r'\s*р-н\.?\s*'),
+    ('село', r'\s*село\s*'),
+    ('с.', r'\s*с\.\s*'),
+    ('деревня', r'\s*деревня\s*'),
+    ('д.', r'\s*д\.\s*'),
+    ('город', r'\s*город\s*'),
+    ('г.', r'\s*г\.\s*'),
+    ('посёлок', r'\s*посёлок\s*'),
+    ('п.', r'\s*п\.\s*'),
+    ('ст.', r'\s*ст\.\s*'),
+    ('станица', r'\s*станица\s*'),
+))
+
+# Варианты кириллических букв (U+1C80..U+1C88), которые IGNORECASE считает
+# равными "в", "д", "о", "с", "т", а lower() не меняет: с ними проверка литерала не годится
+_CASE_VARIANTS_RE = re.compile('[\u1c80-\u1c88]')
+
+# Губерния или область: "(Тульская) губ.", первый подошедший шаблон
+_REGION_PATTERNS = tuple(re.compile(pattern, re.IGNORECASE) for pattern in (
+    r'(\w+)\s+губ\.?',
+    r'(\w+)\s+губерния',
+    r'(\w+)\s+обл\.?',
+    r'(\w+)\s+область',
+))
+
+
+@lru_cache(maxsize=65536)
 def normalize_place(place: str) -> str:
     """Нормализация названия места для сравнения."""
     if not place:
@@ -59,28 +99,11 @@ def normalize_place(place: str) -> str:
     p = place.lower().strip()
 
     # Убираем типичные сокращения и уточнения
-    remove_patterns = [
-        r'\s*губ\.?\s*',
-        r'\s*уезд\.?\s*',
-        r'\s*волость\.?\s*',
-        r'\s*обл\.?\s*',
-        r'\s*область\s*',
-        r'\s*район\s*',
-        r'\s*р-н\.?\s*',
-        r'\s*село\s*',
-        r'\s*с\.\s*',
-        r'\s*деревня\s*',
-        r'\s*д\.\s*',
-        r'\s*город\s*',
-        r'\s*г\.\s*',
-        r'\s*посёлок\s*',
-        r'\s*п\.\s*',
-        r'\s*ст\.\s*',
-        r'\s*станица\s*',
-    ]
-
-    for pattern in remove_patterns:
-        p = re.sub(pattern, ' ', p, flags=re.IGNORECASE)
+    check_keyword = _CASE_VARIANTS_RE.search(p) is None
+    for keyword, pattern in _REMOVE_PATTERNS:
+        if check_keyword and keyword not in p:
+            continue
+        p = pattern.sub(' ', p)
 
     # Убираем лишние пробелы
     p = ' '.join(p.split())
@@ -88,44 +111,42 @@ def normalize_place(place: str) -> str:
     return p
 
 
+@lru_cache(maxsize=65536)
 def extract_main_place(place: str) -> str:
     """Извлечение основного населённого пункта (первая часть)."""
     if not place:
         return ""
 
     # Берём первую часть до запятой
-    parts = place.split(',')
-    if parts:
-        return parts[0].strip()
-    return place.strip()
+    return place.partition(',')[0].strip()
 
 
+@lru_cache(maxsize=65536)
 def extract_region(place: str) -> str:
     """Извлечение региона (губернии, области)."""
     if not place:
         return ""
 
     # Ищем губернию или область
-    patterns = [
-        r'(\w+)\s+губ\.?',
-        r'(\w+)\s+губерния',
-        r'(\w+)\s+обл\.?',
-        r'(\w+)\s+область',
-    ]
-
-    for pattern in patterns:
-        match = re.search(pattern, place, re.IGNORECASE)
+    for pattern in _REGION_PATTERNS:
+        match = pattern.search(place)
         if match:
             return match.group(1).strip()
 
     # Последняя часть после запятой
-    parts = place.split(',')
-    if len(parts) > 1:
-        return parts[-1].strip()
+    _, sep, last = place.rpartition(',')
+    if sep:
+        return last.strip()
 
     return ""
 
 
+@lru_cache(maxsize=65536)
+def _main_place_key(place: str) -> str:
+    """Основное место в нижнем регистре — для сравнения соседних локаций."""
+    return extract_main_place(place).lower()
+
+
 def get_person_locations(person: Person, data: GedcomData) -> List[LocationEvent]:
     """Получить все локации персоны."""
     locations = []
@@ -163,28 +184,26 @@ def get_person_locations(person: Person, data: GedcomData) -> List[LocationEvent
                 normalized_place=normalize_place(residence['place'])
             ))
 
-    # Браки
-    for spouse in data.get_spouses(person):
-        # Находим семью
-        for fam_id in person.spouse_family_ids:
-            family = data.families.get(fam_id)
-            if family and family.marriage_place:
-                year = family.marriage_date.year if family.marriage_date else family.marriage_year
-                locations.append(LocationEvent(
-                    person=person,
-                    event_type='marriage',
-                    place=family.marriage_place,
-                    year=year,
-                    normalized_place=normalize_place(family.marriage_place)
-                ))
-
-    return sorted(locations, key=lambda x: x.year or 9999)
-
-
-def find_person_migrations(person: Person, data: GedcomData) -> List[MigrationEvent]:
-    """Найти миграции персоны."""
+    # Браки (семьи, где персона — супруг)
+    for fam_id in person.fams:
+        family = data.families.get(fam_id)
+        if family and family.marriage_place:
+            year = family.marriage_date.year if family.marriage_date else family.marriage_year
+            locations.append(LocationEvent(
+                person=person,
+                event_type='marriage',
+                place=family.marriage_place,
+                year=year,
+                normalized_place=normalize_place(family.marriage_place)
+            ))
+
+    locations.sort(key=lambda x: x.year or 9999)
+    return locations
+
+
+def find_person_migrations(person: Person, locations: List[LocationEvent]) -> List[MigrationEvent]:
+    """Найти миграции персоны по её локациям (см. get_person_locations)."""
     migrations = []
-    locations = get_person_locations(person, data)
 
     if len(locations) < 2:
         return migrations
@@ -195,10 +214,10 @@ def find_person_migrations(person: Person, data: GedcomData) -> List[MigrationEv
         loc2 = locations[i + 1]
 
         # Сравниваем основные места
-        place1 = extract_main_place(loc1.place)
-        place2 = extract_main_place(loc2.place)
+        place1 = _main_place_key(loc1.place)
+        place2 = _main_place_key(loc2.place)
 
-        if place1.lower() != place2.lower() and place1 and place2:
+        if place1 != place2 and place1 and place2:
             migrations.append(MigrationEvent(
                 person=person,
                 from_place=loc1.place,
@@ -218,7 +237,6 @@ def analyze_all_migrations(data: GedcomData) -> Dict:
         'persons_with_places': 0,
         'persons_with_migrations': 0,
         'total_migrations': 0,
-        'migrations': [],
         'by_place': defaultdict(lambda: {'births': 0, 'deaths': 0, 'arrivals': 0, 'departures': 0}),
         'by_region': defaultdict(lambda: {'births': 0, 'deaths': 0}),
         'migration_routes': defaultdict(int),  # (from, to) -> count
@@ -250,11 +268,10 @@ def analyze_all_migrations(data: GedcomData) -> Dict:
             stats['persons_with_places'] += 1
 
         # Миграции
-        migrations = find_person_migrations(person, data)
+        migrations = find_person_migrations(person, get_person_locations(person, data))
         if migrations:
             stats['persons_with_migrations'] += 1
             stats['total_migrations'] += len(migrations)
-            stats['migrations'].extend(migrations)
 
             for mig in migrations:
                 from_main = extract_main_place(mig.from_place)
@@ -274,16 +291,24 @@ def analyze_all_migrations(data: GedcomData) -> Dict:
 
 
 def analyze_family_origins(data: GedcomData, person: Person, max_gen: int = 5) -> Dict:
-    """Анализ географического происхождения семьи."""
+    """
+    Анализ географического происхождения семьи.
+    Предки обходятся в ширину, каждый учитывается один раз — в ближайшем
+    поколении (при родственных браках один предок встречается по нескольким линиям).
+    """
     origins = {
         'person': person,
         'ancestors_by_place': defaultdict(list),
         'generations': {},
     }
 
-    def traverse(p: Person, gen: int, line: str):
-        if gen > max_gen:
-            return
+    queue = deque([(person, 0, '')])
+    visited = set()
+    while queue:
+        p, gen, line = queue.popleft()
+        if gen > max_gen or p.id in visited:
+            continue
+        visited.add(p.id)
 
         if p.birth_place:
             main_place = extract_main_place(p.birth_place)
@@ -301,13 +326,13 @@ def analyze_family_origins(data: GedcomData, person: Person, max_gen: int = 5) -
                 'line': line
             })
 
-        father, mother = data.get_parents(p)
-        if father:
-            traverse(father, gen + 1, line + 'F')
-        if mother:
-            traverse(mother, gen + 1, line + 'M')
+        if gen < max_gen:
+            father, mother = data.get_parents(p)
+            if father:
+                queue.append((father, gen + 1, line + 'F'))
+            if mother:
+                queue.append((mother, gen + 1, line + 'M'))
 
-    traverse(person, 0, '')
     return origins
 
 
@@ -365,16 +390,16 @@ def main():
 
         # Основные места
         output_lines.append("\n🏠 ОСНОВНЫЕ МЕСТА ПРОИСХОЖДЕНИЯ:")
-        sorted_places = sorted(origins['ancestors_by_place'].items(),
-                               key=lambda x: -len(x[1]))
-        for place, ancestors in sorted_places[:10]:
+        top_places = heapq.nlargest(10, origins['ancestors_by_place'].items(),
+                                    key=lambda x: len(x[1]))
+        for place, ancestors in top_places:
             output_lines.append(f"   {place}: {len(ancestors)} предков")
             for anc in ancestors[:3]:
                 gen_str = gen_names.get(anc['generation'], f"{anc['generation']}-е пок.")
                 output_lines.append(f"      • {anc['person'].name} ({gen_str})")
 
         # Миграции этой персоны
-        migrations = find_person_migrations(person, data)
+        migrations = find_person_migrations(person, get_person_locations(person, data))
         if migrations:
             output_lines.append(f"\n🚶 ПЕРЕМЕЩЕНИЯ {person.given_name or person.name}:")
             for mig in migrations:
@@ -400,13 +425,13 @@ def main():
             output_lines.append("🏘️ ТОП НАСЕЛЁННЫХ ПУНКТОВ")
             output_lines.append("=" * 100)
 
-            sorted_places = sorted(stats['by_place'].items(),
-                                   key=lambda x: -(x[1]['births'] + x[1]['deaths']))
+            top_places = heapq.nlargest(args.top, stats['by_place'].items(),
+                                        key=lambda x: x[1]['births'] + x[1]['deaths'])
 
             output_lines.append(f"\n{'Место':<40} {'Рожд.':<8} {'Смерт.':<8} {'Прибыл':<8} {'Убыл':<8}")
             output_lines.append("-" * 80)
 
-            for place, counts in sorted_places[:args.top]:
+            for place, counts in top_places:
                 if not place:
                     continue
                 place_short = place[:38] + '..' if len(place) > 40 else place
@@ -419,10 +444,10 @@ def main():
             output_lines.append("🗺️ СТАТИСТИКА ПО РЕГИОНАМ (ГУБЕРНИЯМ)")
             output_lines.append("=" * 100)
 
-            sorted_regions = sorted(stats['by_region'].items(),
-                                    key=lambda x: -(x[1]['births'] + x[1]['deaths']))
+            top_regions = heapq.nlargest(15, stats['by_region'].items(),
+                                         key=lambda x: x[1]['births'] + x[1]['deaths'])
 
-            for region, counts in sorted_regions[:15]:
+            for region, counts in top_regions:
                 if not region:
                     continue
                 output_lines.append(f"   {region}: {counts['births']} рождений, {counts['deaths']} смертей")
@@ -433,9 +458,9 @@ def main():
             output_lines.append("🚶 ПОПУЛЯРНЫЕ МАРШРУТЫ МИГРАЦИИ")
             output_lines.append("=" * 100)
 
-            sorted_routes = sorted(stats['migration_routes'].items(), key=lambda x: -x[1])
+            top_routes = heapq.nlargest(15, stats['migration_routes'].items(), key=itemgetter(1))
 
-            for (from_place, to_place), count in sorted_routes[:15]:
+            for (from_place, to_place), count in top_routes:
                 if count > 1:
                     output_lines.append(f"   {from_place} → {to_place}: {count} человек")
 
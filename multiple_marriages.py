@@ -10,15 +10,16 @@
 
 import sys
 import argparse
+import heapq
 from dataclasses import dataclass
 from typing import Optional, List, Dict
 from collections import defaultdict
 
 sys.path.insert(0, '.')
-from lib import parse_gedcom, Person, Family, GedcomData
+from lib import parse_gedcom, Person, Family, GedcomData, summarize_sorted
 
 
-@dataclass
+@dataclass(slots=True)
 class PersonMarriages:
     """Данные о браках персоны."""
     person: Person
@@ -53,23 +54,17 @@ def get_marriage_year(family: Family) -> Optional[int]:
 
 def analyze_person_marriages(person: Person, data: GedcomData) -> Optional[PersonMarriages]:
     """Анализ браков одной персоны."""
-    if not person.spouse_family_ids or len(person.spouse_family_ids) < 2:
+    if len(person.fams) < 2:
         return None
 
-    marriages = []
-    spouses = []
-    marriage_years = []
-    spouse_death_years = []
-    children_counts = []
-    widowed = []
+    # (семья, супруг, год брака, год смерти супруга, количество детей)
+    records = []
 
-    for fam_id in person.spouse_family_ids:
+    for fam_id in person.fams:
         family = data.families.get(fam_id)
         if not family:
             continue
 
-        marriages.append(family)
-
         # Определяем супруга
         if person.sex == 'M':
             spouse_id = family.wife_id
@@ -77,45 +72,24 @@ def analyze_person_marriages(person: Person, data: GedcomData) -> Optional[Perso
             spouse_id = family.husband_id
 
         spouse = data.get_person(spouse_id) if spouse_id else None
-        spouses.append(spouse)
-
-        # Год брака
-        m_year = get_marriage_year(family)
-        marriage_years.append(m_year)
-
-        # Год смерти супруга
         s_death = get_death_year(spouse) if spouse else None
-        spouse_death_years.append(s_death)
 
-        # Количество детей
-        children_counts.append(len(family.children_ids))
+        records.append((family, spouse, get_marriage_year(family), s_death, len(family.children_ids)))
 
-    if len(marriages) < 2:
+    if len(records) < 2:
         return None
 
     # Сортируем по году брака
-    combined = list(zip(marriages, spouses, marriage_years, spouse_death_years, children_counts))
-    combined.sort(key=lambda x: x[2] if x[2] else 9999)
-
-    marriages, spouses, marriage_years, spouse_death_years, children_counts = zip(*combined)
-    marriages = list(marriages)
-    spouses = list(spouses)
-    marriage_years = list(marriage_years)
-    spouse_death_years = list(spouse_death_years)
-    children_counts = list(children_counts)
+    records.sort(key=lambda r: r[2] or 9999)
 
     # Определяем, было ли вдовство перед следующим браком
-    widowed = []
-    for i in range(len(marriages)):
-        if i == 0:
-            widowed.append(False)
-        else:
-            prev_spouse_death = spouse_death_years[i-1]
-            curr_marriage = marriage_years[i]
-            if prev_spouse_death and curr_marriage and prev_spouse_death < curr_marriage:
-                widowed.append(True)
-            else:
-                widowed.append(False)
+    widowed = [False]
+    for i in range(1, len(records)):
+        prev_spouse_death = records[i-1][3]
+        curr_marriage = records[i][2]
+        widowed.append(bool(prev_spouse_death and curr_marriage and prev_spouse_death < curr_marriage))
+
+    marriages, spouses, marriage_years, spouse_death_years, children_counts = map(list, zip(*records))
 
     return PersonMarriages(
         person=person,
@@ -138,6 +112,8 @@ def analyze_all_multiple_marriages(data: GedcomData, before_year: Optional[int]
         'max_marriages': 0,
         'by_count': defaultdict(int),  # количество браков -> количество людей
         'cases': [],
+        'men_cases': [],
+        'women_cases': [],
         'widowed_remarriages': 0,
         'interval_between_marriages': [],
         'children_distribution': [],  # (браков, всего детей)
@@ -164,8 +140,11 @@ def analyze_all_multiple_marriages(data: GedcomData, before_year: Optional[int]
 
         if person.sex == 'M':
             stats['men_multiple'] += 1
+            stats['men_cases'].append(pm)
         else:
             stats['women_multiple'] += 1
+            if person.sex == 'F':
+                stats['women_cases'].append(pm)
 
         num_marriages = len(pm.marriages)
         stats['by_count'][num_marriages] += 1
@@ -248,12 +227,12 @@ def main():
         output_lines.append("⏱️ ИНТЕРВАЛ МЕЖДУ БРАКАМИ")
         output_lines.append("=" * 100)
 
-        intervals = stats['interval_between_marriages']
-        import statistics
-        output_lines.append(f"\n   Средний интервал: {statistics.mean(intervals):.1f} лет")
-        output_lines.append(f"   Медиана: {statistics.median(intervals):.1f} лет")
-        output_lines.append(f"   Минимум: {min(intervals)} лет")
-        output_lines.append(f"   Максимум: {max(intervals)} лет")
+        intervals = sorted(stats['interval_between_marriages'])
+        avg, median, lo, hi = summarize_sorted(intervals)
+        output_lines.append(f"\n   Средний интервал: {avg:.1f} лет")
+        output_lines.append(f"   Медиана: {median:.1f} лет")
+        output_lines.append(f"   Минимум: {lo} лет")
+        output_lines.append(f"   Максимум: {hi} лет")
 
         # Быстрые повторные браки (< 2 лет)
         quick = [i for i in intervals if i < 2]
@@ -276,10 +255,10 @@ def main():
         output_lines.append("📋 СЛУЧАИ ПОВТОРНЫХ БРАКОВ")
         output_lines.append("=" * 100)
 
-        # Сортируем по количеству браков
-        sorted_cases = sorted(stats['cases'], key=lambda x: -len(x.marriages))
+        # 20 случаев с наибольшим числом браков
+        top_cases = heapq.nlargest(20, stats['cases'], key=lambda x: len(x.marriages))
 
-        for pm in sorted_cases[:20]:
+        for pm in top_cases:
             output_lines.append(f"\n   👤 {pm.person.name} ({len(pm.marriages)} брака/браков):")
 
             for i, (spouse, m_year, s_death, children) in enumerate(
@@ -300,8 +279,8 @@ def main():
     output_lines.append("👫 АНАЛИЗ ПО ПОЛУ")
     output_lines.append("=" * 100)
 
-    men_cases = [pm for pm in stats['cases'] if pm.person.sex == 'M']
-    women_cases = [pm for pm in stats['cases'] if pm.person.sex == 'F']
+    men_cases = stats['men_cases']
+    women_cases = stats['women_cases']
 
     if men_cases:
         avg_marriages_men = sum(len(pm.marriages) for pm in men_cases) / len(men_cases)
@@ -40,6 +40,52 @@ def get_given_name(person: Person) -> Optional[str]:
     return None
 
 
+# Варианты одного имени: каноническая форма -> уменьшительные и старые формы
+_NAME_VARIANTS = {
+    'александр': ['саша', 'шура', 'алекс'],
+    'екатерина': ['катя', 'катерина'],
+    'мария': ['маша', 'марья', 'маруся'],
+    'анна': ['аня', 'анюта', 'нюра'],
+    'иван': ['ваня', 'иоанн'],
+    'михаил': ['миша', 'михайло'],
+    'николай': ['коля', 'никола'],
+    'пётр': ['петя', 'петро', 'петр'],
+    'василий': ['вася', 'василь'],
+    'дмитрий': ['дима', 'димитрий', 'митя'],
+    'алексей': ['алёша', 'лёша', 'алексий'],
+    'сергей': ['серёжа', 'сергий'],
+    'андрей': ['андрюша'],
+    'владимир': ['вова', 'володя'],
+    'григорий': ['гриша', 'григор'],
+    'фёдор': ['федя', 'федор', 'феодор'],
+    'степан': ['стёпа', 'степа'],
+    'тимофей': ['тима'],
+    'евдокия': ['дуня', 'авдотья'],
+    'прасковья': ['параша', 'параскева'],
+    'пелагея': ['поля', 'палагея'],
+    'ксения': ['ксюша', 'аксинья'],
+    'наталья': ['наташа', 'наталия'],
+    'елизавета': ['лиза'],
+    'татьяна': ['таня'],
+    'ольга': ['оля'],
+}
+
+
+def _build_name_lookup() -> Tuple[Dict[str, str], Dict[str, str]]:
+    """Плоские таблицы для normalize_name вместо перебора _NAME_VARIANTS на каждый вызов:
+    имя или вариант -> каноническая форма; каноническая форма без ё -> она же."""
+    lookup = {}
+    lookup_ye = {}
+    for canonical, variants in _NAME_VARIANTS.items():
+        for variant in (canonical, *variants):
+            lookup.setdefault(variant, canonical)
+        lookup_ye.setdefault(canonical.replace('ё', 'е'), canonical)
+    return lookup, lookup_ye
+
+
+_NAME_LOOKUP, _NAME_LOOKUP_YE = _build_name_lookup()
+
+
 def normalize_name(name: str) -> str:
     """Нормализовать имя."""
     if not name:
@@ -48,47 +94,11 @@ def normalize_name(name: str) -> str:
     # Базовая нормализация
     n = name.strip().lower()
 
-    # Варианты одного имени
-    name_variants = {
-        'александр': ['саша', 'шура', 'алекс'],
-        'екатерина': ['катя', 'катерина'],
-        'мария': ['маша', 'марья', 'маруся'],
-        'анна': ['аня', 'анюта', 'нюра'],
-        'иван': ['ваня', 'иоанн'],
-        'михаил': ['миша', 'михайло'],
-        'николай': ['коля', 'никола'],
-        'пётр': ['петя', 'петро', 'петр'],
-        'василий': ['вася', 'василь'],
-        'дмитрий': ['дима', 'димитрий', 'митя'],
-        'алексей': ['алёша', 'лёша', 'алексий'],
-        'сергей': ['серёжа', 'сергий'],
-        'андрей': ['андрюша'],
-        'владимир': ['вова', 'володя'],
-        'григорий': ['гриша', 'григор'],
-        'фёдор': ['федя', 'федор', 'феодор'],
-        'степан': ['стёпа', 'степа'],
-        'тимофей': ['тима'],
-        'евдокия': ['дуня', 'авдотья'],
-        'прасковья': ['параша', 'параскева'],
-        'пелагея': ['поля', 'палагея'],
-        'ксения': ['ксюша', 'аксинья'],
-        'наталья': ['наташа', 'наталия'],
-        'елизавета': ['лиза'],
-        'татьяна': ['таня'],
-        'ольга': ['оля'],
-    }
-
-    # Проверяем варианты
-    for canonical, variants in name_variants.items():
-        if n == canonical or n in variants:
-            return canonical
-        # Проверяем без ё/е
-        n_ye = n.replace('ё', 'е')
-        canonical_ye = canonical.replace('ё', 'е')
-        if n_ye == canonical_ye:
-            return canonical
-
-    return n
+    # Проверяем варианты, затем совпадение без ё/е
+    canonical = _NAME_LOOKUP.get(n)
+    if canonical is not None:
+        return canonical
+    return _NAME_LOOKUP_YE.get(n.replace('ё', 'е'), n)
 
 
 def analyze_name_trends(data: GedcomData) -> Dict:
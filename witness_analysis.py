@@ -20,6 +20,18 @@ sys.path.insert(0, '.')
 from lib import parse_gedcom, Person, Family, GedcomData
 
 
+# Типы связей свидетелей в ASSO (RELA): первый подошедший ключ задаёт роль
+WITNESS_ROLES = {
+    'witness': 'свидетель',
+    'свидетель': 'свидетель',
+    'поручитель': 'поручитель',
+    'восприемник': 'восприемник',
+    'godfather': 'крёстный отец',
+    'godmother': 'крёстная мать',
+    'godparent': 'крёстный',
+}
+
+
 @dataclass
 class WitnessRecord:
     """Запись о свидетеле."""
@@ -93,29 +105,18 @@ def find_witnesses_from_associations(person: Person, data: GedcomData) -> List[T
     """Найти свидетелей из ASSO записей."""
     witnesses = []
 
-    if not hasattr(person, 'associations') or not person.associations:
-        return witnesses
-
+    # RELA приводится к нижнему регистру при разборе
     for assoc in person.associations:
-        if not hasattr(assoc, 'relation') or not assoc.relation:
+        rel = assoc.relation
+        if not rel:
             continue
 
-        rel = assoc.relation.lower()
-
-        # Типы связей свидетелей
-        witness_roles = {
-            'witness': 'свидетель',
-            'свидетель': 'свидетель',
-            'поручитель': 'поручитель',
-            'восприемник': 'восприемник',
-            'godfather': 'крёстный отец',
-            'godmother': 'крёстная мать',
-            'godparent': 'крёстный',
-        }
-
-        for key, role in witness_roles.items():
+        for key, role in WITNESS_ROLES.items():
             if key in rel:
-                assoc_id = getattr(assoc, 'person_id', None)
+                assoc_id = assoc.person_id
+                # Пустой указатель ASSO — свидетеля не опознать
+                if assoc_id is None:
+                    break
                 assoc_person = data.get_person(assoc_id) if assoc_id else None
                 name = assoc_person.name if assoc_person else assoc_id
                 witnesses.append((name, role, assoc_id))
@@ -130,21 +131,21 @@ def is_relative(person1: Person, person2: Person, data: GedcomData) -> Tuple[boo
         return False, None
 
     # Сиблинги
-    if person1.child_family_id and person2.child_family_id:
-        if person1.child_family_id == person2.child_family_id:
+    if person1.famc and person2.famc:
+        if person1.famc == person2.famc:
             return True, "брат/сестра"
 
     # Родитель-ребёнок
-    if person1.child_family_id:
-        family = data.families.get(person1.child_family_id)
+    if person1.famc:
+        family = data.families.get(person1.famc)
         if family:
             if family.husband_id == person2.id:
                 return True, "отец"
             if family.wife_id == person2.id:
                 return True, "мать"
 
-    if person2.child_family_id:
-        family = data.families.get(person2.child_family_id)
+    if person2.famc:
+        family = data.families.get(person2.famc)
         if family:
             if family.husband_id == person1.id:
                 return True, "ребёнок"
@@ -152,7 +153,7 @@ def is_relative(person1: Person, person2: Person, data: GedcomData) -> Tuple[boo
                 return True, "ребёнок"
 
     # Супруги
-    for fam_id in (person1.spouse_family_ids or []):
+    for fam_id in person1.fams:
         family = data.families.get(fam_id)
         if family:
             if family.husband_id == person2.id or family.wife_id == person2.id:
@@ -160,15 +161,15 @@ def is_relative(person1: Person, person2: Person, data: GedcomData) -> Tuple[boo
 
     # Дядя/тётя - племянник
     # Проверяем родителей person1
-    if person1.child_family_id:
-        p1_family = data.families.get(person1.child_family_id)
+    if person1.famc:
+        p1_family = data.families.get(person1.famc)
         if p1_family:
             for parent_id in [p1_family.husband_id, p1_family.wife_id]:
                 if not parent_id:
                     continue
                 parent = data.get_person(parent_id)
-                if parent and parent.child_family_id:
-                    grandparent_family = data.families.get(parent.child_family_id)
+                if parent and parent.famc:
+                    grandparent_family = data.families.get(parent.famc)
                     if grandparent_family:
                         # Сиблинги родителя = дяди/тёти
                         for child_id in grandparent_family.children_ids: